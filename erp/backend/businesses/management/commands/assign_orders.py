@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from ...services.assignment_optimizer import AssignmentOptimizer
+
+
+class Command(BaseCommand):
+    help = "Assign all PAID/CONFIRMED orders in a time window with the global assignment optimizer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="ISO datetime, lower bound of preferred_start_time")
+        parser.add_argument("--end", help="ISO datetime, upper bound of preferred_start_time")
+        parser.add_argument("--dry-run", action="store_true", help="Compute the plan without saving it")
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_datetime(options["start"]) if options["start"] else None
+            end = parse_datetime(options["end"]) if options["end"] else None
+        except ValueError:
+            raise CommandError("start/end must be ISO datetimes")
+        if (options["start"] and start is None) or (options["end"] and end is None):
+            raise CommandError("start/end must be ISO datetimes")
+        if start and end and start >= end:
+            raise CommandError("start must be before end")
+
+        started = time.perf_counter()
+        orders = list(AssignmentOptimizer.assignable_orders(start=start, end=end))
+        plan = AssignmentOptimizer.plan(orders, AssignmentOptimizer.active_employees())
+        if not options["dry_run"]:
+            plan = AssignmentOptimizer.apply(plan)
+        elapsed = time.perf_counter() - started
+
+        for match in plan:
+            self.stdout.write(
+                f"{match['order'].id} -> {match['employee'].id} (score {match['factors']['total']:.2f})"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Assigned {len(plan)} of {len(orders)} orders in {elapsed:.2f}s"
+            + (" (dry run)" if options["dry_run"] else "")
+        ))
@@ -0,0 +1,204 @@
+import random
+import time
+import tracemalloc
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from hr.models import Customer, EmployeeSkill, Order, ServiceType, Skill
+from hr.services.service_type_catalogue import ServiceTypeCatalogue
+from ...models import Employee
+from ...models.employee import EmployeeWorkingStatus
+from ...services.assignment_optimizer import AssignmentOptimizer
+from ...services.employee_pool_stats import EmployeePoolStats
+from ...services.recommendation import RecommendationService
+from ...services.recommendation_cache import RecommendationCache
+from ...services.shift_index import ShiftIndex
+from ...services.skill_index import SkillKeywordIndex
+from ...views.recommendation import RecommendationViewSet
+
+AREAS = ['Hải Châu', 'Thanh Khê', 'Sơn Trà', 'Ngũ Hành Sơn', 'Liên Chiểu', 'Cẩm Lệ', 'Hòa Vang']
+SERVICE_TYPES = [
+    ("Regular Cleaning", 40000, 40),
+    ("Deep Cleaning", 50000, 30),
+]
+SKILL_NAMES = ["Regular Cleaning", "Deep Cleaning", "Window Washing", "Sofa Cleaning", "Ironing"]
+SHIFTS = [
+    (dt_time(6, 0), dt_time(14, 0)),
+    (dt_time(8, 0), dt_time(17, 0)),
+    (dt_time(13, 0), dt_time(22, 0)),
+    (dt_time(22, 0), dt_time(6, 0)),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the recommendation engine on synthetic employees/orders: "
+        "p50/p99 latency, query count and peak memory. Fixtures are rolled back unless --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=1000, help="Number of synthetic employees")
+        parser.add_argument("--orders", type=int, default=50, help="Number of synthetic PAID orders")
+        parser.add_argument("--limit", type=int, default=20, help="Top-K size for the limit/offset scenarios")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--keep", action="store_true", help="Keep the generated rows instead of rolling back")
+
+    def handle(self, *args, **options):
+        if options["employees"] < 1 or options["orders"] < 1:
+            raise CommandError("--employees and --orders must be positive")
+        random.seed(options["seed"])
+
+        # Không ghi DecisionLog và không chạy thread tính trước trong lúc đo
+        with override_settings(RECOMMENDATION_AUDIT=False, RECOMMENDATION_PRECOMPUTE=False):
+            try:
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    orders = self._create_fixtures(options["employees"], options["orders"])
+                    self.stdout.write(
+                        f"Created {options['employees']} employees and {len(orders)} orders "
+                        f"in {time.perf_counter() - started:.1f}s ({connection.vendor})"
+                    )
+                    self._reset_caches()
+                    self._run(orders, options["limit"])
+                    if not options["keep"]:
+                        transaction.set_rollback(True)
+            finally:
+                # Các cache trong process có thể đã đọc dữ liệu giả
+                self._reset_caches()
+
+    def _run(self, orders, limit):
+        view = RecommendationViewSet()
+        factory = APIRequestFactory()
+
+        def call_view(order, **params):
+            request = Request(factory.get("/", params))
+            response = view.get_recommendations(request, pk=str(order.id))
+            if response.status_code != 200:
+                raise CommandError(f"get_recommendations failed: {response.data}")
+
+        def uncached_view(order):
+            RecommendationCache.discard_order(order.id)
+            call_view(order)
+
+        def score_all(order):
+            RecommendationService.score_candidates(
+                order, RecommendationCache.candidate_employees(order), audit=False
+            )
+
+        def top_k(order):
+            RecommendationService.top_candidates(
+                order, RecommendationCache.candidate_employees(order), limit=limit, audit=False
+            )
+
+        scenarios = [
+            ("get_recommendations (uncached)", uncached_view, orders),
+            ("get_recommendations (cached)", call_view, orders),
+            (f"get_recommendations (cached, limit={limit})", lambda order: call_view(order, limit=limit), orders),
+            ("score_candidates", score_all, orders),
+            (f"top_candidates (limit={limit})", top_k, orders),
+            (
+                f"AssignmentOptimizer.plan ({len(orders)} orders)",
+                lambda _: AssignmentOptimizer.plan(orders, AssignmentOptimizer.active_employees()),
+                [None],
+            ),
+        ]
+
+        self.stdout.write(f"{'scenario':<44} {'runs':>5} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak MiB':>9}")
+        for name, func, items in scenarios:
+            latencies, queries = [], []
+            for item in items:
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    func(item)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                queries.append(len(captured))
+
+            # Đo bộ nhớ ở một lượt riêng vì tracemalloc làm chậm đáng kể
+            tracemalloc.start()
+            func(items[0])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{name:<44} {len(latencies):>5} {np.percentile(latencies, 50):>9.2f} "
+                f"{np.percentile(latencies, 99):>9.2f} {np.mean(queries):>8.1f} {peak / 2 ** 20:>9.2f}"
+            )
+
+    def _create_fixtures(self, employee_count, order_count):
+        service_types = [
+            ServiceType.objects.get_or_create(
+                name=name, defaults={"price_per_m2": price, "cleaning_rate_m2_per_h": rate}
+            )[0]
+            for name, price, rate in SERVICE_TYPES
+        ]
+        skills = [Skill.objects.get_or_create(name=name)[0] for name in SKILL_NAMES]
+
+        employees = []
+        for index in range(employee_count):
+            start, end = random.choice(SHIFTS)
+            employees.append(Employee(
+                first_name="Benchmark",
+                last_name=f"Employee {index}",
+                status=random.choice([EmployeeWorkingStatus.ACTIVE] * 4 + [EmployeeWorkingStatus.INACTIVE]),
+                area=random.choice(AREAS),
+                working_start_time=start,
+                working_end_time=end,
+                completed_orders_count=random.randint(0, 200),
+                salary=Decimal(random.randrange(5_000_000, 20_000_000, 100_000)),
+                total_hours_worked=Decimal(random.randint(0, 2000)),
+            ))
+        Employee.objects.bulk_create(employees, batch_size=1000)
+
+        employee_skills = [
+            EmployeeSkill(employee=employee, skill=skill)
+            for employee in employees
+            for skill in random.sample(skills, random.randint(1, 3))
+        ]
+        EmployeeSkill.objects.bulk_create(employee_skills, batch_size=1000)
+
+        customers = [
+            Customer(
+                name=f"Benchmark Customer {index}",
+                phone="0900000000",
+                email=f"benchmark{index}@example.com",
+                password="",
+                address="Benchmark",
+                area=random.choice(AREAS),
+            )
+            for index in range(min(order_count, 100))
+        ]
+        Customer.objects.bulk_create(customers, batch_size=1000)
+
+        today = timezone.now().replace(minute=0, second=0, microsecond=0)
+        orders = []
+        for index in range(order_count):
+            hours = random.randint(2, 4)
+            start = today + timedelta(days=random.randint(1, 7), hours=random.randint(0, 23) - today.hour)
+            orders.append(Order(
+                customer=random.choice(customers),
+                service_type=random.choice(service_types),
+                area_m2=Decimal(random.randint(30, 150)),
+                requested_hours=Decimal(hours),
+                estimated_hours=Decimal(hours),
+                preferred_start_time=start,
+                preferred_end_time=start + timedelta(hours=hours),
+                status='PAID',
+            ))
+        Order.objects.bulk_create(orders, batch_size=1000)
+        return list(Order.objects.filter(id__in=[order.id for order in orders]).select_related('customer'))
+
+    @staticmethod
+    def _reset_caches():
+        EmployeePoolStats.invalidate()
+        ShiftIndex.invalidate()
+        SkillKeywordIndex.invalidate()
+        ServiceTypeCatalogue.invalidate()
+        RecommendationCache.invalidate()
@@ -6,6 +6,7 @@ from django.utils import timezone
 import pytz
 from base.serializers import WritableNestedSerializer
 from ..models import Employee
+from ..services.shift_index import minute_of_day, shift_covers
 from hr.models.skill import EmployeeSkill, Skill
 from oauth.models import User, Role
 from oauth.serializers import UserShortSerializer, RoleShortSerializer
@@ -14,6 +15,16 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+def current_working_time():
+    """Get current time in Vietnam timezone"""
+    try:
+        vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+        return timezone.now().astimezone(vietnam_tz).time()
+    except Exception:
+        return timezone.now().time()
+
+
 class EmployeeSerializer(WritableNestedSerializer):
     user = UserShortSerializer(required=False)
     user_id = serializers.PrimaryKeyRelatedField(required=False, write_only=True, queryset=User.objects.all(),
@@ -125,23 +136,14 @@ class EmployeeSerializer(WritableNestedSerializer):
                     'status_text': 'No working hours set'
                 }
             
-            # Get current time in Vietnam timezone
-            try:
-                vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
-                current_time = timezone.now().astimezone(vietnam_tz).time()
-            except Exception:
-                current_time = timezone.now().time()
-            
-            start_time = obj.working_start_time
-            end_time = obj.working_end_time
-            
-            # Check if current time is within working hours
-            if start_time <= end_time:
-                # Normal shift: same day
-                is_within_hours = start_time <= current_time <= end_time
-            else:
-                # Overnight shift: crosses midnight
-                is_within_hours = current_time >= start_time or current_time <= end_time
+            # Check if current time is within working hours (kể cả ca qua nửa đêm)
+            current_minute = minute_of_day(current_working_time())
+            is_within_hours = shift_covers(
+                minute_of_day(obj.working_start_time),
+                minute_of_day(obj.working_end_time),
+                current_minute,
+                current_minute,
+            )
             
             if is_within_hours:
                 return {
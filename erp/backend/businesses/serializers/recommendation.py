@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from businesses.models import Employee
-from hr.models import Order, Customer, Skill, EmployeeSkill
+from hr.models import Order, Customer, Skill
 
 class SkillSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,12 +26,11 @@ class RecommendationEmployeeSerializer(serializers.ModelSerializer):
 
     def get_skills(self, obj):
         """Lấy danh sách kỹ năng của nhân viên từ bảng liên kết"""
-        # Lấy các bản ghi EmployeeSkill liên quan đến nhân viên này
-        employee_skills = EmployeeSkill.objects.filter(employee=obj)
-        # Trả về danh sách tên kỹ năng
-        return [es.skill.name for es in employee_skills]
+        # Dùng employeeskill_set để tận dụng prefetch_related từ view
+        return [es.skill.name for es in obj.employeeskill_set.all()]
 
 class RecommendationSerializer(serializers.Serializer):
     employee = RecommendationEmployeeSerializer()
-    score = serializers.IntegerField()
+    # Điểm tổng là float làm tròn 2 chữ số (RecommendationService.score_candidates), 0-100
+    score = serializers.FloatField()
     reasons = serializers.ListField(child=serializers.CharField())
\ No newline at end of file
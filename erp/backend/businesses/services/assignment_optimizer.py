@@ -0,0 +1,248 @@
+import logging
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from scipy.optimize import linear_sum_assignment
+
+from hr.models import Assignment, DecisionLog, Order
+from ..models import Employee
+from ..models.employee import EmployeeWorkingStatus
+from .employee_pool import EmployeePool
+from .recommendation import RecommendationService
+from .recommendation_cache import RecommendationCache
+
+logger = logging.getLogger(__name__)
+
+
+class AssignmentOptimizer:
+    """
+    Global assignment of assignable orders (PAID/CONFIRMED) to active employees.
+
+    - Chi phí của một cặp (đơn, nhân viên) là -score của RecommendationService.
+    - Các đơn được chia thành nhóm chồng lấn thời gian; mỗi nhóm được giải bằng
+      linear_sum_assignment (Hungarian) theo từng vòng. Sau mỗi vòng, các cặp làm nhân viên
+      trùng giờ với đơn đã nhận (kể cả Assignment có sẵn) bị loại, nên không nhân viên nào
+      nhận hai đơn chồng lấn.
+    - Mỗi đơn chỉ giữ CANDIDATES_PER_ORDER ứng viên tốt nhất để ma trận nhỏ.
+    """
+    CANDIDATES_PER_ORDER = 50
+    INFEASIBLE_COST = 1e9
+
+    @staticmethod
+    def assignable_status_filter():
+        """Trạng thái có thể phân công, không phân biệt hoa thường như Order.can_assign_employee."""
+        condition = Q()
+        for status in Order.ASSIGNABLE_STATUSES:
+            condition |= Q(status__iexact=status)
+        return condition
+
+    @classmethod
+    def assignable_orders(cls, start=None, end=None):
+        """Assignable orders without any assignment, optionally within [start, end] by preferred_start_time."""
+        orders = Order.objects.filter(
+            cls.assignable_status_filter(),
+            assignment__isnull=True,
+        ).select_related('customer')
+        if start:
+            orders = orders.filter(preferred_start_time__gte=start)
+        if end:
+            orders = orders.filter(preferred_start_time__lte=end)
+        return orders.order_by('preferred_start_time')
+
+    @staticmethod
+    def active_employees():
+        return Employee.objects.filter(status=EmployeeWorkingStatus.ACTIVE).only(
+            'id', 'first_name', 'last_name', 'area', 'salary', 'completed_orders_count',
+        )
+
+    @classmethod
+    def plan(cls, orders, employees):
+        """
+        Compute the assignment without writing anything.
+
+        Returns:
+            list[dict]: [{'order', 'employee', 'factors'}]
+        """
+        orders = list(orders)
+        candidates = list(employees)
+        if not orders or not candidates:
+            return []
+
+        pool = EmployeePool(candidates)
+        contexts = [RecommendationService.load_scoring_context(order) for order in orders]
+        totals = np.empty((len(orders), len(pool)), dtype=np.float32)
+        # Nhân viên có ca làm việc bao trọn khung giờ của từng đơn
+        available = np.zeros((len(orders), len(pool)), dtype=bool)
+        for row, (order, context) in enumerate(zip(orders, contexts)):
+            totals[row] = pool.score(order, context)['total']
+            available[row] = pool.employee_mask(context['available_ids'])
+
+        starts = np.array([order.preferred_start_time.timestamp() for order in orders])
+        ends = np.array([order.preferred_end_time.timestamp() for order in orders])
+        busy = cls._existing_busy_intervals(orders, pool)
+
+        matches = []
+        for group in cls._overlap_groups(starts, ends):
+            remaining = np.array(group)
+            while len(remaining):
+                assigned = cls._solve_round(totals, available, remaining, starts, ends, busy)
+                if not assigned:
+                    break
+                for order_row, employee_row in assigned:
+                    busy.append((employee_row, starts[order_row], ends[order_row]))
+                    matches.append((order_row, employee_row))
+                assigned_rows = {order_row for order_row, _ in assigned}
+                remaining = np.array([row for row in remaining if row not in assigned_rows])
+
+        logger.info(f"Assignment optimizer matched {len(matches)} of {len(orders)} orders")
+
+        plan = []
+        for order_row, employee_row in matches:
+            scores = pool.score(orders[order_row], contexts[order_row])
+            plan.append({
+                'order': orders[order_row],
+                'employee': candidates[employee_row],
+                'factors': {name: float(values[employee_row]) for name, values in scores.items()},
+            })
+        return plan
+
+    @classmethod
+    def apply(cls, plan):
+        """
+        Bulk-create the Assignment and DecisionLog rows of a plan.
+
+        Đơn và nhân viên được khóa (select_for_update) và kiểm tra lại trong transaction, nên một lần
+        chạy song song hoặc phân công thủ công xen giữa không làm một đơn/nhân viên bị giao hai lần;
+        các cặp không còn hợp lệ bị bỏ qua.
+
+        Returns:
+            list[dict]: các phần tử của plan đã thực sự được lưu
+        """
+        if not plan:
+            return []
+        with transaction.atomic():
+            order_ids = {match['order'].id for match in plan}
+            employee_ids = {match['employee'].id for match in plan}
+            # Khóa theo thứ tự id để hai lần chạy song song không deadlock
+            open_order_ids = set(
+                Order.objects.select_for_update().filter(
+                    cls.assignable_status_filter(), id__in=order_ids
+                ).order_by('id').values_list('id', flat=True)
+            )
+            open_order_ids -= set(
+                Assignment.objects.filter(order_id__in=open_order_ids).values_list('order_id', flat=True)
+            )
+            active_employee_ids = set(
+                Employee.objects.select_for_update().filter(
+                    id__in=employee_ids, status=EmployeeWorkingStatus.ACTIVE
+                ).order_by('id').values_list('id', flat=True)
+            )
+            applied = [
+                match for match in plan
+                if match['order'].id in open_order_ids and match['employee'].id in active_employee_ids
+            ]
+            if len(applied) < len(plan):
+                logger.warning(
+                    f"Assignment optimizer skipped {len(plan) - len(applied)} stale matches"
+                )
+            if not applied:
+                return []
+
+            now = timezone.now()
+            Assignment.objects.bulk_create([
+                Assignment(
+                    order=match['order'],
+                    employee=match['employee'],
+                    assigned_time=now,
+                    status='assigned',
+                    work_hours=match['order'].estimated_hours,
+                    cost=Decimal('0'),
+                )
+                for match in applied
+            ], batch_size=500)
+            DecisionLog.objects.bulk_create([
+                RecommendationService.build_decision_log(
+                    match['order'], match['employee'], match['factors'], notes="Batch assignment optimizer"
+                )
+                for match in applied
+            ], batch_size=500)
+            # Giống phân công thủ công: nhân viên được giao việc chuyển sang INACTIVE
+            Employee.objects.filter(
+                id__in={match['employee'].id for match in applied}
+            ).update(status=EmployeeWorkingStatus.INACTIVE)
+            # bulk_create/update không gửi signal
+            transaction.on_commit(RecommendationCache.invalidate)
+        return applied
+
+    @staticmethod
+    def _overlap_groups(starts, ends):
+        """Groups of orders whose time windows overlap transitively (quét theo giờ bắt đầu)."""
+        groups = []
+        current = []
+        current_end = -np.inf
+        for row in np.argsort(starts, kind='stable'):
+            if current and starts[row] >= current_end:
+                groups.append(current)
+                current = []
+                current_end = -np.inf
+            current.append(int(row))
+            current_end = max(current_end, ends[row])
+        if current:
+            groups.append(current)
+        return groups
+
+    @staticmethod
+    def _existing_busy_intervals(orders, pool):
+        """(employee_row, start, end) of existing assignments overlapping the orders' time range."""
+        window_start = min(order.preferred_start_time for order in orders)
+        window_end = max(order.preferred_end_time for order in orders)
+        rows = Assignment.objects.filter(
+            order__preferred_end_time__gt=window_start,
+            order__preferred_start_time__lt=window_end,
+        ).values_list('employee_id', 'order__preferred_start_time', 'order__preferred_end_time')
+        return [
+            (pool.row_index[employee_id], start.timestamp(), end.timestamp())
+            for employee_id, start, end in rows
+            if employee_id in pool.row_index
+        ]
+
+    @classmethod
+    def _solve_round(cls, totals, available, remaining, starts, ends, busy):
+        """One min-cost assignment round; each employee gets at most one of the remaining orders."""
+        scores = totals[remaining]
+        # Không giao cho nhân viên ngoài ca, kể cả khi tổng điểm cao; đơn không có ai thì để trống
+        allowed = (scores > 0) & available[remaining]
+
+        # Loại các nhân viên đã bận trong khung giờ của đơn
+        if busy:
+            busy_rows, busy_starts, busy_ends = (np.array(column) for column in zip(*busy))
+            overlaps = (
+                (starts[remaining][:, None] < busy_ends[None, :])
+                & (busy_starts[None, :] < ends[remaining][:, None])
+            )
+            order_index, busy_index = np.nonzero(overlaps)
+            allowed[order_index, busy_rows[busy_index]] = False
+
+        # Chỉ giữ top-K ứng viên mỗi đơn
+        if allowed.shape[1] > cls.CANDIDATES_PER_ORDER:
+            masked = np.where(allowed, scores, -np.inf)
+            top = np.argpartition(-masked, cls.CANDIDATES_PER_ORDER - 1, axis=1)[:, :cls.CANDIDATES_PER_ORDER]
+            keep = np.zeros_like(allowed)
+            np.put_along_axis(keep, top, True, axis=1)
+            allowed &= keep
+
+        columns = np.flatnonzero(allowed.any(axis=0))
+        if not len(columns):
+            return []
+
+        allowed = allowed[:, columns]
+        cost = np.where(allowed, -scores[:, columns].astype(float), cls.INFEASIBLE_COST)
+        order_index, column_index = linear_sum_assignment(cost)
+        return [
+            (int(remaining[i]), int(columns[j]))
+            for i, j in zip(order_index, column_index)
+            if allowed[i, j]
+        ]
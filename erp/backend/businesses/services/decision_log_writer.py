@@ -0,0 +1,56 @@
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections
+
+from hr.models import DecisionLog
+
+logger = logging.getLogger(__name__)
+
+
+class DecisionLogWriter:
+    """
+    Persist DecisionLog rows with one bulk_create per scoring run.
+
+    Chế độ background đẩy các lô vào một thread nền duy nhất để request không phải chờ insert.
+    """
+    BATCH_SIZE = 500
+
+    _queue = queue.Queue()
+    _thread = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def write(cls, logs, background=False):
+        if not logs:
+            return
+        if not background:
+            DecisionLog.objects.bulk_create(logs, batch_size=cls.BATCH_SIZE)
+            return
+        cls._ensure_thread()
+        cls._queue.put(logs)
+
+    @classmethod
+    def flush(cls):
+        """Block until every queued batch has been written."""
+        cls._queue.join()
+
+    @classmethod
+    def _ensure_thread(cls):
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name="decision-log-writer", daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            logs = cls._queue.get()
+            try:
+                DecisionLog.objects.bulk_create(logs, batch_size=cls.BATCH_SIZE)
+            except Exception:
+                logger.exception("Failed to write %s decision logs", len(logs))
+            finally:
+                close_old_connections()
+                cls._queue.task_done()
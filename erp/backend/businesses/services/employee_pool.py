@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class EmployeePool:
+    """
+    Columnar representation of a set of employees for vectorized scoring.
+
+    Mỗi thuộc tính là một mảng NumPy cùng thứ tự với `employees`:
+    - area_codes: mã khu vực (-1 nếu không có), tra ngược qua `area_index`
+    - salaries, completed_orders: lương và số đơn đã hoàn thành
+
+    Giờ làm việc được khớp qua `ShiftIndex`, kỹ năng qua `SkillKeywordIndex`;
+    `row_index` map employee_id -> vị trí trong pool.
+    """
+
+    def __init__(self, employees):
+        self.employees = list(employees)
+        size = len(self.employees)
+
+        self.area_codes = np.full(size, -1, dtype=np.int32)
+        self.salaries = np.zeros(size)
+        self.completed_orders = np.zeros(size, dtype=np.int64)
+        self.area_index = {}
+        self.row_index = {}
+
+        for row, employee in enumerate(self.employees):
+            self.row_index[employee.id] = row
+            if employee.area:
+                self.area_codes[row] = self.area_index.setdefault(employee.area, len(self.area_index))
+            self.salaries[row] = float(employee.salary or 0)
+            self.completed_orders[row] = int(employee.completed_orders_count or 0)
+
+    def __len__(self):
+        return len(self.employees)
+
+    def employee_mask(self, employee_ids):
+        """Boolean mask of the pool rows whose employee id is in `employee_ids`."""
+        mask = np.zeros(len(self), dtype=bool)
+        rows = [self.row_index[employee_id] for employee_id in employee_ids if employee_id in self.row_index]
+        mask[rows] = True
+        return mask
+
+    def score(self, order, context):
+        """
+        Score the whole pool against one order.
+
+        Returns:
+            dict: factor name -> np.ndarray (availability, area, skill, cost, workload, total)
+        """
+        size = len(self)
+
+        availability = np.where(self.employee_mask(context['available_ids']), 30.0, 0.0)
+
+        area = np.zeros(size)
+        order_area = context['order_area']
+        if order_area and order_area in self.area_index:
+            area = np.where(self.area_codes == self.area_index[order_area], 15.0, 0.0)
+
+        skill = np.where(self.employee_mask(context['skill_matches']), 15.0, 0.0)
+
+        # Lương càng thấp điểm càng cao
+        cost = np.zeros(size)
+        max_salary = float(context['max_salary'])
+        min_salary = float(context['min_salary'])
+        salary_range = max_salary - min_salary
+        if salary_range > 0:
+            cost = np.round(30 * (1 - (self.salaries - min_salary) / salary_range), 2)
+
+        workload = np.zeros(size)
+        max_completed_orders = context['max_completed_orders']
+        if max_completed_orders > 0:
+            workload = np.round(10 * (1 - self.completed_orders / max_completed_orders), 2)
+
+        return {
+            'availability': availability,
+            'area': area,
+            'skill': skill,
+            'cost': cost,
+            'workload': workload,
+            'total': np.round(availability + area + skill + cost + workload, 2),
+        }
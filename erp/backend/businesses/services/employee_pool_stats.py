@@ -0,0 +1,129 @@
+import threading
+import time
+from decimal import Decimal
+
+
+class EmployeePoolStats:
+    """
+    Process-wide cache of the employee statistics used to normalise recommendation scores
+    (max/min/avg lương, max/avg số đơn đã hoàn thành).
+
+    - Tính một lần từ database ở lần đọc đầu tiên.
+    - Cập nhật dần khi Employee được lưu hoặc xóa (xem `businesses.signals`).
+    - Tự load lại sau TTL_SECONDS để bù cho các thay đổi không đi qua signal
+      (queryset.update, worker khác, ...).
+    """
+    TTL_SECONDS = 300
+
+    _lock = threading.RLock()
+    _loaded_at = None
+    _salaries = {}  # employee_id -> salary (chỉ các nhân viên có lương)
+    _completed_orders = {}  # employee_id -> completed_orders_count
+    _salary_sum = Decimal('0')
+    _completed_orders_sum = 0
+    _max_salary = None
+    _min_salary = None
+    _max_completed_orders = None
+
+    @classmethod
+    def get(cls):
+        """
+        Current statistics, same keys and semantics as the Django aggregates they replace:
+        max_salary, min_salary, avg_salary, max_completed_orders, avg_orders (None nếu không có dữ liệu).
+        """
+        with cls._lock:
+            if cls._loaded_at is None or time.monotonic() - cls._loaded_at > cls.TTL_SECONDS:
+                cls.refresh()
+            salary_count = len(cls._salaries)
+            employee_count = len(cls._completed_orders)
+            return {
+                'max_salary': cls._max_salary,
+                'min_salary': cls._min_salary,
+                'avg_salary': cls._salary_sum / salary_count if salary_count else None,
+                'max_completed_orders': cls._max_completed_orders,
+                'avg_orders': cls._completed_orders_sum / employee_count if employee_count else None,
+            }
+
+    @classmethod
+    def refresh(cls):
+        """Reload every statistic from the database (một query)."""
+        from ..models.employee import Employee
+
+        rows = Employee.objects.values_list('id', 'salary', 'completed_orders_count')
+        with cls._lock:
+            cls._salaries = {}
+            cls._completed_orders = {}
+            for employee_id, salary, completed_orders in rows:
+                if salary is not None:
+                    cls._salaries[employee_id] = salary
+                cls._completed_orders[employee_id] = completed_orders or 0
+            cls._recompute()
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls):
+        """Force a reload on the next read."""
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def update_employee(cls, employee):
+        """Apply a saved employee's salary and completed_orders_count to the cached statistics."""
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            old_salary = cls._salaries.pop(employee.id, None)
+            old_completed_orders = cls._completed_orders.pop(employee.id, None)
+            if old_salary is not None:
+                cls._salary_sum -= old_salary
+            if old_completed_orders is not None:
+                cls._completed_orders_sum -= old_completed_orders
+
+            salary = employee.salary
+            completed_orders = employee.completed_orders_count or 0
+            if salary is not None:
+                salary = Decimal(str(salary))
+                cls._salaries[employee.id] = salary
+                cls._salary_sum += salary
+            cls._completed_orders[employee.id] = completed_orders
+            cls._completed_orders_sum += completed_orders
+
+            # Chỉ tính lại toàn bộ khi giá trị cực trị cũ bị thay đổi
+            if old_salary is not None and old_salary in (cls._max_salary, cls._min_salary):
+                cls._recompute_salary_bounds()
+            elif salary is not None:
+                cls._max_salary = salary if cls._max_salary is None else max(cls._max_salary, salary)
+                cls._min_salary = salary if cls._min_salary is None else min(cls._min_salary, salary)
+            if old_completed_orders is not None and old_completed_orders == cls._max_completed_orders:
+                cls._max_completed_orders = max(cls._completed_orders.values(), default=None)
+            elif cls._max_completed_orders is None or completed_orders > cls._max_completed_orders:
+                cls._max_completed_orders = completed_orders
+
+    @classmethod
+    def remove_employee(cls, employee_id):
+        """Drop a deleted employee from the cached statistics."""
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            salary = cls._salaries.pop(employee_id, None)
+            completed_orders = cls._completed_orders.pop(employee_id, None)
+            if salary is not None:
+                cls._salary_sum -= salary
+                if salary in (cls._max_salary, cls._min_salary):
+                    cls._recompute_salary_bounds()
+            if completed_orders is not None:
+                cls._completed_orders_sum -= completed_orders
+                if completed_orders == cls._max_completed_orders:
+                    cls._max_completed_orders = max(cls._completed_orders.values(), default=None)
+
+    @classmethod
+    def _recompute(cls):
+        cls._salary_sum = sum(cls._salaries.values(), Decimal('0'))
+        cls._completed_orders_sum = sum(cls._completed_orders.values())
+        cls._recompute_salary_bounds()
+        cls._max_completed_orders = max(cls._completed_orders.values(), default=None)
+
+    @classmethod
+    def _recompute_salary_bounds(cls):
+        cls._max_salary = max(cls._salaries.values(), default=None)
+        cls._min_salary = min(cls._salaries.values(), default=None)
@@ -0,0 +1,191 @@
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+
+from hr.models import Assignment, Order
+from ..models import Employee
+from ..models.employee import EmployeeWorkingStatus
+from ..serializers.recommendation import RecommendationSerializer
+from .recommendation import RecommendationService
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationCache:
+    """
+    Process-wide cache of the ranked, serialized recommendation list of each assignable order.
+
+    - Tính trước bằng một thread nền khi đơn chuyển sang PAID/CONFIRMED (`schedule`), nên
+      mở đơn chỉ là một lần đọc cache.
+    - Thay đổi của nhân viên/kỹ năng làm toàn bộ cache hết hạn (tăng version), vì thống kê
+      lương/số đơn dùng để chuẩn hóa điểm là chung cho mọi đơn; các đơn đã cache được tính lại ở nền.
+    - Khi một nhân viên được giao việc, nhân viên đó bị loại khỏi mọi danh sách đã lưu.
+    - Cache và signal chỉ có trong từng process, nên mỗi lần đọc trúng cache còn kiểm tra lại bằng
+      một query (`_changed_since`): nhân viên được tạo/sửa sau lúc tính, hoặc ứng viên đã lưu không
+      còn ACTIVE hay vừa được giao việc ở worker khác thì danh sách được tính lại.
+    - Tự hết hạn sau TTL_SECONDS để bù cho các thay đổi còn lại (kỹ năng sửa ở worker khác, ...).
+    """
+    TTL_SECONDS = 300
+
+    _lock = threading.RLock()
+    _version = 0
+    _entries = {}  # order_id -> (version, computed_at (datetime), [recommendation])
+    _pending = set()  # order_id đang chờ trong hàng đợi
+    _queue = queue.Queue()
+    _thread = None
+
+    @staticmethod
+    def candidate_employees(order):
+        """Active employees not yet assigned to the order."""
+        assigned_employee_ids = Assignment.objects.filter(order=order).values_list('employee_id', flat=True)
+        return Employee.objects.filter(
+            status=EmployeeWorkingStatus.ACTIVE
+        ).exclude(
+            id__in=assigned_employee_ids
+        ).only(
+            'id', 'first_name', 'last_name', 'area', 'salary',
+            'completed_orders_count', 'total_hours_worked',
+        )
+
+    @classmethod
+    def get(cls, order_id):
+        """Cached recommendations of an order, or None if missing, stale or outdated by another process."""
+        key = str(order_id)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            version, computed_at, recommendations = entry
+            expired = (
+                version != cls._version
+                or timezone.now() - computed_at > timedelta(seconds=cls.TTL_SECONDS)
+            )
+        if expired or cls._changed_since(computed_at, recommendations):
+            with cls._lock:
+                if cls._entries.get(key) is entry:
+                    del cls._entries[key]
+            return None
+        return recommendations
+
+    @staticmethod
+    def _changed_since(computed_at, recommendations):
+        """
+        Whether an employee was created/edited after `computed_at`, or a cached candidate is no
+        longer ACTIVE or has been assigned since then (một query, bắt cả thay đổi của worker khác).
+        """
+        employee_ids = [match['employee']['id'] for match in recommendations]
+        return Employee.objects.filter(
+            Q(updated_at__gte=computed_at)
+            | Q(id__in=employee_ids) & (
+                ~Q(status=EmployeeWorkingStatus.ACTIVE) | Q(assignment__created_at__gte=computed_at)
+            )
+        ).exists()
+
+    @classmethod
+    def store(cls, order_id, version, computed_at, recommendations):
+        """Cache a computed list unless the cache has been invalidated since `version` was read."""
+        with cls._lock:
+            # Bỏ qua kết quả nếu dữ liệu đầu vào đã thay đổi trong lúc tính
+            if version == cls._version:
+                cls._entries[str(order_id)] = (version, computed_at, recommendations)
+
+    @classmethod
+    def compute(cls, order):
+        """Score, rank and serialize the candidates of an order, then cache the result."""
+        with cls._lock:
+            version = cls._version
+        # Lấy thời điểm trước khi đọc dữ liệu để thay đổi xảy ra trong lúc tính vẫn bị `_changed_since` bắt
+        computed_at = timezone.now()
+
+        scored = RecommendationService.score_candidates(order, cls.candidate_employees(order))
+        recommendations = [match for match in scored if match['score'] > 0]
+        recommendations.sort(key=lambda match: match['score'], reverse=True)
+        prefetch_related_objects(
+            [match['employee'] for match in recommendations], 'employeeskill_set__skill'
+        )
+        data = list(RecommendationSerializer(recommendations, many=True).data)
+        cls.store(order.id, version, computed_at, data)
+        return data
+
+    @classmethod
+    def get_or_compute(cls, order):
+        recommendations = cls.get(order.id)
+        if recommendations is None:
+            recommendations = cls.compute(order)
+        return recommendations
+
+    @classmethod
+    def schedule(cls, order):
+        """Precompute the recommendations of an assignable order in the background after commit."""
+        if not order.can_assign_employee() or not getattr(settings, 'RECOMMENDATION_PRECOMPUTE', True):
+            return
+        order_id = str(order.id)
+        transaction.on_commit(lambda: cls._enqueue([order_id]))
+
+    @classmethod
+    def discard_order(cls, order_id):
+        with cls._lock:
+            cls._entries.pop(str(order_id), None)
+
+    @classmethod
+    def discard_employee(cls, employee_id):
+        """Drop an employee that has just been assigned from every cached list."""
+        employee_id = str(employee_id)
+        with cls._lock:
+            for order_id, (version, computed_at, recommendations) in cls._entries.items():
+                cls._entries[order_id] = (
+                    version,
+                    computed_at,
+                    [match for match in recommendations if str(match['employee']['id']) != employee_id],
+                )
+
+    @classmethod
+    def invalidate(cls):
+        """Expire every cached list and recompute the cached orders in the background."""
+        with cls._lock:
+            cls._version += 1
+            order_ids = list(cls._entries)
+            cls._entries = {}
+        if getattr(settings, 'RECOMMENDATION_PRECOMPUTE', True):
+            cls._enqueue(order_ids)
+
+    @classmethod
+    def flush(cls):
+        """Block until every queued precomputation has finished."""
+        cls._queue.join()
+
+    @classmethod
+    def _enqueue(cls, order_ids):
+        with cls._lock:
+            order_ids = [order_id for order_id in order_ids if order_id not in cls._pending]
+            if not order_ids:
+                return
+            cls._pending.update(order_ids)
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name="recommendation-precompute", daemon=True)
+                cls._thread.start()
+        for order_id in order_ids:
+            cls._queue.put(order_id)
+
+    @classmethod
+    def _run(cls):
+        while True:
+            order_id = cls._queue.get()
+            try:
+                with cls._lock:
+                    cls._pending.discard(order_id)
+                if cls.get(order_id) is None:
+                    order = Order.objects.select_related('customer').filter(id=order_id).first()
+                    if order is not None and order.can_assign_employee():
+                        cls.compute(order)
+            except Exception:
+                logger.exception("Failed to precompute recommendations for order %s", order_id)
+            finally:
+                close_old_connections()
+                cls._queue.task_done()
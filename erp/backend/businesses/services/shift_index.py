@@ -0,0 +1,157 @@
+import threading
+import time
+
+import numpy as np
+
+
+def minute_of_day(value):
+    """Phút trong ngày của một `datetime.time` (giữ cả giây để so sánh chính xác)."""
+    return value.hour * 60 + value.minute + value.second / 60 + value.microsecond / 60000000
+
+
+def shift_covers(shift_start, shift_end, window_start, window_end):
+    """
+    Whether a working shift covers a time window (mọi giá trị là phút trong ngày).
+
+    - Ca trong ngày (start <= end): khung giờ phải nằm trọn trong ca.
+    - Ca qua nửa đêm (start > end): bắt đầu sau giờ vào ca hoặc kết thúc trước giờ tan ca.
+    Một thời điểm là khung giờ có window_start == window_end.
+    """
+    if shift_start <= shift_end:
+        return shift_start <= window_start and window_end <= shift_end
+    return window_start >= shift_start or window_end <= shift_end
+
+
+class ShiftIndex:
+    """
+    Process-wide minute-of-day interval index over employee working hours.
+
+    Ca trong ngày được sắp theo giờ bắt đầu; ca qua nửa đêm được sắp theo cả giờ bắt đầu
+    và giờ kết thúc. Mỗi truy vấn chỉ là vài lần `np.searchsorted` và một phép lọc trên
+    phần đầu của mảng, không duyệt từng nhân viên.
+
+    Cập nhật khi Employee được lưu hoặc xóa (xem `businesses.signals`) và tự load lại sau TTL_SECONDS.
+    """
+    TTL_SECONDS = 300
+
+    _lock = threading.RLock()
+    _loaded_at = None
+    _shifts = {}  # employee_id -> (start_minute, end_minute)
+    _dirty = True
+
+    # Mảng của ca trong ngày, sắp theo giờ bắt đầu
+    _day_starts = np.empty(0)
+    _day_ends = np.empty(0)
+    _day_ids = np.empty(0, dtype=object)
+    # Mảng của ca qua nửa đêm
+    _night_starts = np.empty(0)
+    _night_ids_by_start = np.empty(0, dtype=object)
+    _night_ends = np.empty(0)
+    _night_ids_by_end = np.empty(0, dtype=object)
+
+    @classmethod
+    def available_between(cls, start, end):
+        """
+        Ids of employees whose shift covers the window [start, end].
+        `start`/`end` là `datetime`/`time` hoặc phút trong ngày.
+        """
+        window_start = cls._to_minute(start)
+        window_end = cls._to_minute(end)
+        with cls._lock:
+            cls._ensure_built()
+
+            # Ca trong ngày: start <= window_start và window_end <= end
+            count = np.searchsorted(cls._day_starts, window_start, side='right')
+            available = set(cls._day_ids[:count][cls._day_ends[:count] >= window_end])
+
+            # Ca qua nửa đêm: window_start >= start hoặc window_end <= end
+            count = np.searchsorted(cls._night_starts, window_start, side='right')
+            available.update(cls._night_ids_by_start[:count])
+            first = np.searchsorted(cls._night_ends, window_end, side='left')
+            available.update(cls._night_ids_by_end[first:])
+        return available
+
+    @classmethod
+    def available_at(cls, moment):
+        """Ids of employees whose shift contains `moment`."""
+        return cls.available_between(moment, moment)
+
+    @classmethod
+    def refresh(cls):
+        """Reload every employee shift from the database."""
+        from ..models.employee import Employee
+
+        rows = Employee.objects.filter(
+            working_start_time__isnull=False,
+            working_end_time__isnull=False,
+        ).values_list('id', 'working_start_time', 'working_end_time')
+        shifts = {
+            employee_id: (minute_of_day(start), minute_of_day(end))
+            for employee_id, start, end in rows
+        }
+        with cls._lock:
+            cls._shifts = shifts
+            cls._dirty = True
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls):
+        """Force a reload on the next query."""
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def update_employee(cls, employee):
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            shift = None
+            if employee.working_start_time and employee.working_end_time:
+                shift = (minute_of_day(employee.working_start_time), minute_of_day(employee.working_end_time))
+            if cls._shifts.get(employee.id) == shift:
+                return
+            if shift is None:
+                cls._shifts.pop(employee.id, None)
+            else:
+                cls._shifts[employee.id] = shift
+            cls._dirty = True
+
+    @classmethod
+    def remove_employee(cls, employee_id):
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            if cls._shifts.pop(employee_id, None) is not None:
+                cls._dirty = True
+
+    @classmethod
+    def _ensure_built(cls):
+        if cls._loaded_at is None or time.monotonic() - cls._loaded_at > cls.TTL_SECONDS:
+            cls.refresh()
+        if not cls._dirty:
+            return
+
+        day = [(start, end, employee_id) for employee_id, (start, end) in cls._shifts.items() if start <= end]
+        night = [(start, end, employee_id) for employee_id, (start, end) in cls._shifts.items() if start > end]
+
+        day.sort(key=lambda shift: shift[0])
+        cls._day_starts = np.array([shift[0] for shift in day], dtype=float)
+        cls._day_ends = np.array([shift[1] for shift in day], dtype=float)
+        cls._day_ids = np.array([shift[2] for shift in day], dtype=object)
+
+        night.sort(key=lambda shift: shift[0])
+        cls._night_starts = np.array([shift[0] for shift in night], dtype=float)
+        cls._night_ids_by_start = np.array([shift[2] for shift in night], dtype=object)
+        night.sort(key=lambda shift: shift[1])
+        cls._night_ends = np.array([shift[1] for shift in night], dtype=float)
+        cls._night_ids_by_end = np.array([shift[2] for shift in night], dtype=object)
+
+        cls._dirty = False
+
+    @staticmethod
+    def _to_minute(value):
+        if isinstance(value, (int, float)):
+            return float(value)
+        if hasattr(value, 'time'):
+            value = value.time()
+        return minute_of_day(value)
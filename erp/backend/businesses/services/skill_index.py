@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import defaultdict
+
+
+class SkillKeywordIndex:
+    """
+    Process-wide inverted index keyword -> skill_id -> employee_id for skill matching.
+
+    Giữ nguyên quy tắc cũ: một kỹ năng khớp với kỹ năng yêu cầu nếu tên của nó chứa
+    một từ khóa (dài hơn 3 ký tự) của kỹ năng yêu cầu. Từ khóa của mọi ServiceType được
+    dựng sẵn khi load; từ khóa khác được tính lần đầu rồi ghi nhớ.
+
+    Cập nhật khi Skill/EmployeeSkill thay đổi (xem `businesses.signals`) và tự load lại sau TTL_SECONDS.
+    """
+    TTL_SECONDS = 300
+
+    _lock = threading.RLock()
+    _loaded_at = None
+    _skill_names = {}  # skill_id -> name
+    _skill_employees = defaultdict(set)  # skill_id -> {employee_id}
+    _keyword_skills = {}  # keyword -> frozenset(skill_id)
+
+    @staticmethod
+    def keywords(required_skill):
+        """Tách từ khóa chính từ tên kỹ năng (chỉ từ khóa có ít nhất 4 ký tự)."""
+        return [keyword for keyword in required_skill.lower().split() if len(keyword) > 3]
+
+    @classmethod
+    def match(cls, required_skills):
+        """
+        Employees whose skills match any of the required skills, in one lookup.
+
+        Returns:
+            dict: employee_id -> [(req_skill, emp_skill)]
+        """
+        matches = defaultdict(list)
+        with cls._lock:
+            cls._ensure_loaded()
+            for req_skill in required_skills:
+                skill_ids = set()
+                for keyword in cls.keywords(req_skill):
+                    skill_ids |= cls._skill_ids_for_keyword(keyword)
+                for skill_id in sorted(skill_ids, key=cls._skill_names.get):
+                    for employee_id in cls._skill_employees.get(skill_id, ()):
+                        matches[employee_id].append((req_skill, cls._skill_names[skill_id]))
+        return matches
+
+    @classmethod
+    def refresh(cls):
+        """Reload skills and employee skills from the database and prebuild ServiceType keywords."""
+        from hr.models import EmployeeSkill, Skill
+        from hr.services.service_type_catalogue import ServiceTypeCatalogue
+
+        skill_names = dict(Skill.objects.values_list('id', 'name'))
+        skill_employees = defaultdict(set)
+        for employee_id, skill_id in EmployeeSkill.objects.values_list('employee_id', 'skill_id'):
+            skill_employees[skill_id].add(employee_id)
+        service_type_names = [service_type.name for service_type in ServiceTypeCatalogue.all()]
+
+        with cls._lock:
+            cls._skill_names = skill_names
+            cls._skill_employees = skill_employees
+            cls._keyword_skills = {}
+            for name in service_type_names:
+                for keyword in cls.keywords(name or ''):
+                    cls._skill_ids_for_keyword(keyword)
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls):
+        """Force a reload on the next lookup."""
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def update_skill(cls, skill):
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            cls._skill_names[skill.id] = skill.name
+            # Tên kỹ năng thay đổi làm sai các từ khóa đã ghi nhớ
+            cls._keyword_skills = {}
+
+    @classmethod
+    def remove_skill(cls, skill_id):
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            cls._skill_names.pop(skill_id, None)
+            cls._skill_employees.pop(skill_id, None)
+            cls._keyword_skills = {}
+
+    @classmethod
+    def add_employee_skill(cls, employee_id, skill_id):
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            if skill_id not in cls._skill_names:
+                # Kỹ năng mới chưa có trong index
+                cls._loaded_at = None
+                return
+            cls._skill_employees[skill_id].add(employee_id)
+
+    @classmethod
+    def remove_employee_skill(cls, employee_id, skill_id):
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            cls._skill_employees.get(skill_id, set()).discard(employee_id)
+
+    @classmethod
+    def _ensure_loaded(cls):
+        if cls._loaded_at is None or time.monotonic() - cls._loaded_at > cls.TTL_SECONDS:
+            cls.refresh()
+
+    @classmethod
+    def _skill_ids_for_keyword(cls, keyword):
+        skill_ids = cls._keyword_skills.get(keyword)
+        if skill_ids is None:
+            skill_ids = frozenset(
+                skill_id for skill_id, name in cls._skill_names.items() if keyword in name.lower()
+            )
+            cls._keyword_skills[keyword] = skill_ids
+        return skill_ids
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from hr.models import Assignment, EmployeeSkill, Order, Skill
+from .models import Employee
+from .services.employee_pool_stats import EmployeePoolStats
+from .services.recommendation_cache import RecommendationCache
+from .services.shift_index import ShiftIndex
+from .services.skill_index import SkillKeywordIndex
+
+
+@receiver(post_save, sender=Employee)
+def update_employee_pool_stats(sender, instance, **kwargs):
+    """Giữ thống kê lương/khối lượng công việc và ca làm việc luôn mới khi nhân viên được lưu."""
+    transaction.on_commit(lambda: EmployeePoolStats.update_employee(instance))
+    transaction.on_commit(lambda: ShiftIndex.update_employee(instance))
+    transaction.on_commit(RecommendationCache.invalidate)
+
+
+@receiver(post_delete, sender=Employee)
+def remove_employee_pool_stats(sender, instance, **kwargs):
+    employee_id = instance.id
+    transaction.on_commit(lambda: EmployeePoolStats.remove_employee(employee_id))
+    transaction.on_commit(lambda: ShiftIndex.remove_employee(employee_id))
+    transaction.on_commit(RecommendationCache.invalidate)
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: SkillKeywordIndex.update_skill(instance))
+    transaction.on_commit(RecommendationCache.invalidate)
+
+
+@receiver(post_delete, sender=Skill)
+def remove_skill_index(sender, instance, **kwargs):
+    skill_id = instance.id
+    transaction.on_commit(lambda: SkillKeywordIndex.remove_skill(skill_id))
+    transaction.on_commit(RecommendationCache.invalidate)
+
+
+@receiver(post_save, sender=EmployeeSkill)
+def add_employee_skill_index(sender, instance, **kwargs):
+    employee_id, skill_id = instance.employee_id, instance.skill_id
+    transaction.on_commit(lambda: SkillKeywordIndex.add_employee_skill(employee_id, skill_id))
+    transaction.on_commit(RecommendationCache.invalidate)
+
+
+@receiver(post_delete, sender=EmployeeSkill)
+def remove_employee_skill_index(sender, instance, **kwargs):
+    employee_id, skill_id = instance.employee_id, instance.skill_id
+    transaction.on_commit(lambda: SkillKeywordIndex.remove_employee_skill(employee_id, skill_id))
+    transaction.on_commit(RecommendationCache.invalidate)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def discard_order_recommendations(sender, instance, **kwargs):
+    """Đơn thay đổi (trạng thái, giờ, dịch vụ, ...) làm danh sách đề xuất đã lưu không còn đúng."""
+    order_id = instance.id
+    transaction.on_commit(lambda: RecommendationCache.discard_order(order_id))
+
+
+@receiver(post_save, sender=Assignment)
+def discard_assigned_employee_recommendations(sender, instance, created, **kwargs):
+    """Nhân viên vừa được giao việc không còn là ứng viên của các đơn khác."""
+    if not created:
+        return
+    employee_id = instance.employee_id
+    transaction.on_commit(lambda: RecommendationCache.discard_employee(employee_id))
+
+
+@receiver(post_delete, sender=Assignment)
+def invalidate_unassigned_employee_recommendations(sender, instance, **kwargs):
+    transaction.on_commit(RecommendationCache.invalidate)
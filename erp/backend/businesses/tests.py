@@ -1,3 +1,56 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from hr.models import Assignment, Customer, Order, ServiceType
+from .models import Employee
+from .models.employee import EmployeeWorkingStatus
+from .services.recommendation_cache import RecommendationCache
+
+
+@override_settings(RECOMMENDATION_PRECOMPUTE=False)
+class RecommendationCacheTests(TestCase):
+    """
+    TestCase không chạy các callback on_commit, nên mọi thao tác ghi ở đây giống như được
+    thực hiện ở một worker khác: cache của process này không nhận được signal nào.
+    """
+
+    def setUp(self):
+        service_type = ServiceType.objects.create(name="Deep Clean", price_per_m2=59000, cleaning_rate_m2_per_h=20)
+        customer = Customer.objects.create(
+            name="Khách", phone="0900000000", email="khach@example.com",
+            password="x", address="1 Bạch Đằng", area="Hải Châu",
+        )
+        start = timezone.now() + timedelta(days=1)
+        self.order = Order.objects.create(
+            customer=customer, service_type=service_type, area_m2=50, requested_hours=2,
+            preferred_start_time=start, preferred_end_time=start + timedelta(hours=2),
+            estimated_hours=2, status='PAID',
+        )
+        self.employee = Employee.objects.create(first_name="An", status=EmployeeWorkingStatus.ACTIVE)
+
+        RecommendationCache.invalidate()
+        self.recommendations = [{'employee': {'id': str(self.employee.id)}, 'score': 80.0}]
+        RecommendationCache.store(
+            self.order.id, RecommendationCache._version, timezone.now(), self.recommendations
+        )
+
+    def test_serves_cached_list_while_nothing_changed(self):
+        self.assertEqual(RecommendationCache.get(self.order.id), self.recommendations)
+
+    def test_employee_status_change_invalidates_cached_order(self):
+        Employee.objects.filter(id=self.employee.id).update(status=EmployeeWorkingStatus.INACTIVE)
+        self.assertIsNone(RecommendationCache.get(self.order.id))
+
+    def test_employee_edit_invalidates_cached_order(self):
+        self.employee.salary = 9000000
+        self.employee.save()
+        self.assertIsNone(RecommendationCache.get(self.order.id))
+
+    def test_assignment_invalidates_cached_order(self):
+        Assignment.objects.create(
+            order=self.order, employee=self.employee, assigned_time=timezone.now(),
+            status='ASSIGNED', work_hours=2, cost=100000,
+        )
+        self.assertIsNone(RecommendationCache.get(self.order.id))
@@ -22,7 +22,6 @@ from drf_nested_forms.utils import NestedForm
 from oauthlib.oauth2.rfc6749.utils import list_to_scope
 from oauth2_provider.views.mixins import OAuthLibMixin
 from oauth2_provider.signals import app_authorized
-from oauth2_provider.models import get_access_token_model
 from django.contrib.auth import get_user_model
 from common.constants import Http
 from core.settings.base import (
@@ -33,16 +32,20 @@ from base.views.base import BaseViewSet
 from base.services import Verification
 from oauth.serializers import UserShortSerializer
 from oauth.permissions import IsAdministrator
+from oauth.principal import get_principal
+from oauth.oauth_validators import issued_access_token
+from oauth.role_scopes import RoleScopeCache
 from ..models import Employee
 from ..serializers import EmployeeSerializer
+from ..serializers.employee import current_working_time
 from ..services import EmployeeService
-from django.db.models import Q
+from ..services.shift_index import ShiftIndex
+from django.db.models import Prefetch, Q
 from django.core.paginator import Paginator
 from rest_framework import status
 from datetime import datetime, date
 
 User = get_user_model()
-AccessToken = get_access_token_model()
 
 class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
     queryset = Employee.objects.exclude(roles__name__in=["Super Administrator"]).order_by('-created_at', 'first_name', 'last_name')
@@ -83,14 +86,12 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
             
             # Nếu user chỉ có scope employees:view-mine
             if 'employees:view-mine' in token_scopes and 'employees:view' not in token_scopes and 'admin:employees:view' not in token_scopes:
-                try:
-                    # Lấy User từ JWTUser
-                    jwt_user = self.request.auth.user
-                    real_user = User.objects.get(email=jwt_user.email)
-                    return queryset.filter(user=real_user)
-                except User.DoesNotExist:
+                # User thật (từ JWTUser) được resolve một lần cho cả request
+                real_user = get_principal(self.request).user
+                if real_user is None:
                     # Nếu không tìm thấy user, return empty queryset
                     return queryset.none()
+                return queryset.filter(user=real_user)
         
         return queryset
 
@@ -128,12 +129,16 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
                         )
                     elif status_value in [1, 2]:
                         # Has working hours, filter by computed status
-                        # This will be handled by serializer computation
                         queryset = queryset.filter(
                             working_start_time__isnull=False,
                             working_end_time__isnull=False
                         )
-                        # Additional filtering will happen in serializer
+                        # Nhân viên đang trong ca, tra trên interval index
+                        active_ids = ShiftIndex.available_at(current_working_time())
+                        if status_value == 1:
+                            queryset = queryset.filter(id__in=active_ids)
+                        else:
+                            queryset = queryset.exclude(id__in=active_ids)
                         
                 except (ValueError, TypeError):
                     pass
@@ -172,17 +177,6 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
             try:
                 serializer = self.get_serializer(page_obj, many=True)
                 serialized_data = serializer.data
-                if computed_status is not None and computed_status != '':
-                    try:
-                        status_value = int(computed_status)
-                        if status_value in [1, 2]:
-                            # Filter serialized data by computed_status
-                            serialized_data = [
-                                item for item in serialized_data 
-                                if item.get('computed_status') == status_value
-                            ]
-                    except (ValueError, TypeError):
-                        pass
             except Exception as e:
                 print(f"Serialization error: {e}")
                 # Fallback: serialize without computed fields
@@ -374,21 +368,17 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
             
             # Nếu user chỉ có scope employees:view-mine, chỉ cho xem profile của chính mình
             if 'employees:view-mine' in token_scopes and 'employees:view' not in token_scopes and 'admin:employees:view' not in token_scopes:
-                try:
-                    # ✅ Lấy User từ JWTUser
-                    jwt_user = request.auth.user
-                    real_user = User.objects.get(email=jwt_user.email)
-                    
-                    if instance.user != real_user:
-                        return Response(
-                            {"detail": "You do not have permission to view this employee."},
-                            status=HTTP_403_FORBIDDEN
-                        )
-                except User.DoesNotExist:
+                real_user = get_principal(request).user
+                if real_user is None:
                     return Response(
                         {"detail": "User not found."},
                         status=HTTP_404_NOT_FOUND
                     )
+                if instance.user_id != real_user.id:
+                    return Response(
+                        {"detail": "You do not have permission to view this employee."},
+                        status=HTTP_403_FORBIDDEN
+                    )
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -403,65 +393,22 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
         """Get current user's employee profile"""
         try:
             
-            jwt_user = request.auth.user
-
-            user_email = None
-            user_id = None
-            
-            # Từ JWT user attributes
-            if hasattr(jwt_user, 'email') and jwt_user.email:
-                user_email = jwt_user.email
-            
-            # Từ JWT user id
-            elif hasattr(jwt_user, 'id') and jwt_user.id:
-                user_id = jwt_user.id
-            
-            # Từ JWT user username
-            elif hasattr(jwt_user, 'username') and jwt_user.username:
-                user_email = jwt_user.username  # Thường username = email
-            
-            # Từ access token
-            elif hasattr(request.auth, 'user') and request.auth.user != jwt_user:
-                real_token_user = request.auth.user
-                if hasattr(real_token_user, 'email'):
-                    user_email = real_token_user.email
-            
-            # Tìm User trong database
-            real_user = None
-            if user_email:
-                try:
-                    real_user = User.objects.get(email=user_email)
-                except User.DoesNotExist:
-                    print(f"User not found with email: {user_email}")
-            elif user_id:
-                try:
-                    real_user = User.objects.get(id=user_id)
-                    user_email = real_user.email
-                except User.DoesNotExist:
-                    print(f"User not found with ID: {user_id}")
+            # User/Employee thật đã được resolve một lần cho cả request
+            principal = get_principal(request)
+            real_user = principal.user
             
             if not real_user:
                 return Response(
                     {"detail": "Cannot determine user from JWT token"},
                     status=HTTP_404_NOT_FOUND
                 )
+            user_email = real_user.email
             
             # Tìm employee bằng User object
-            try:
-                employee = Employee.objects.get(user=real_user)
-                
-                serializer = self.get_serializer(employee)
+            if principal.employee is not None:
+                serializer = self.get_serializer(principal.employee)
                 return Response(serializer.data, status=HTTP_200_OK)
-                
-            except Employee.DoesNotExist:
-                
-                # Debug: Kiểm tra employees trong DB
-                all_employees = Employee.objects.all()
-                # print(f"Total employees in DB: {all_employees.count()}")
-                for emp in all_employees[:5]:
-                    user_info = f"User: {emp.user}" if emp.user else "User: None"
-                    # print(f"  - Employee: {emp.work_mail}, {user_info}")
-                
+            else:
                 # Alternative: Tìm employee bằng email
                 try:
                     employee_by_email = Employee.objects.get(work_mail=user_email)
@@ -507,14 +454,17 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
             jwt_user = request.auth.user
             print(f"JWT user: {vars(jwt_user)}")
             print(f"JWT user email: {getattr(jwt_user, 'email', None)}")
-            real_user = User.objects.get(email=jwt_user.email)
+            principal = get_principal(request)
+            real_user = principal.user
+            if real_user is None:
+                raise User.DoesNotExist(f"No user for {getattr(jwt_user, 'email', None)}")
             print(f"Real user: {real_user}")
 
             # Tìm employee bằng real User hoặc email
-            try:
-                employee = Employee.objects.get(user=real_user)
+            employee = principal.employee
+            if employee is not None:
                 print(f"Found employee by user: {employee}")
-            except Employee.DoesNotExist:
+            else:
                 print("Employee not found by user, try by work_mail")
                 # Fallback: tìm bằng email
                 employee = Employee.objects.get(work_mail=real_user.email)
@@ -681,7 +631,10 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
             # user_name = request.POST.get("username")
             user_name = request.data.get("username")  # đọc từ JSON
             password = request.data.get("password")
-            user = User.objects.prefetch_related("employees").get(email=user_name)
+            user = User.objects.prefetch_related(
+                # Cùng thứ tự với employees.first(); roles dùng cho RoleScopeCache khi chưa có cache
+                Prefetch("employees", queryset=Employee.objects.order_by("pk").prefetch_related("roles")),
+            ).get(email=user_name)
             
         except User.DoesNotExist:
             return Response(
@@ -691,11 +644,9 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
         scopes = set()
         # Employee permissions
         if user.employees:
-            employee = user.employees.first()
+            employee = next(iter(user.employees.all()), None)
             if employee is not None:
-                if employee.roles is not None:
-                    for role in  employee.roles.all():
-                        scopes = scopes.union(set(role.scopes.keys()))
+                scopes = set(RoleScopeCache.employee_scopes(employee))
            
         request.POST._mutable = True
         request.POST.update(
@@ -721,8 +672,9 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
             access_token = json.loads(body).get("access_token")
             print("Access token:", access_token)
             if access_token is not None:
-                token = AccessToken.objects.get(token=access_token)
-                app_authorized.send(sender=self, request=request, token=token)
+                token = issued_access_token(access_token)
+                if token is not None:
+                    app_authorized.send(sender=self, request=request, token=token)
         response = HttpResponse(content=body, status=status)
 
         for k, v in headers.items():
@@ -750,8 +702,9 @@ class EmployeeViewSet(OAuthLibMixin, BaseViewSet):
         if status == 200:
             access_token = json.loads(body).get("access_token")
             if access_token is not None:
-                token =AccessToken.objects.get(token=access_token)
-                app_authorized.send(sender=self, request=request, token=token)
+                token = issued_access_token(access_token)
+                if token is not None:
+                    app_authorized.send(sender=self, request=request, token=token)
         response = HttpResponse(content=body, status=status)
 
         for k, v in headers.items():
@@ -1,11 +1,14 @@
+from django.db.models import prefetch_related_objects
+from django.utils.dateparse import parse_datetime
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from ..models import Employee
-from hr.models import Order, Assignment
+from hr.models import Order
 from hr.models import Customer
 from ..serializers.recommendation import RecommendationSerializer
 from ..services.recommendation import RecommendationService
+from ..services.assignment_optimizer import AssignmentOptimizer
+from ..services.recommendation_cache import RecommendationCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,49 +25,81 @@ class RecommendationViewSet(ViewSet):
         "destroy": [["roles:edit"]],
         "list": [["roles:edit"], ["roles:view"]],
         "get_recommendations": [["roles:edit"], ["roles:view"]],  # Thêm cái này  
+        "assign_orders": [["roles:edit"]],
     }
 
     @action(detail=True, methods=['get'], url_path='recommendations')
     def get_recommendations(self, request, pk=None):
         """
         Get recommended employees for an order based on various factors
+
+        Query params:
+            limit: chỉ trả về K nhân viên tốt nhất (top-K, kèm count/limit/offset)
+            offset: bỏ qua N nhân viên đầu tiên (dùng cùng limit)
         """
         try:
+            limit = request.query_params.get('limit')
+            offset = request.query_params.get('offset', 0)
+            try:
+                limit = int(limit) if limit not in (None, '') else None
+                offset = int(offset or 0)
+            except (ValueError, TypeError):
+                return Response({'error': 'limit and offset must be integers'}, status=400)
+            if (limit is not None and limit < 1) or offset < 0:
+                return Response({'error': 'limit must be positive and offset must not be negative'}, status=400)
+
             logger.info(f"Getting recommendations for order: {pk}")
-            order = Order.objects.get(id=pk)
 
-            assigned_employee_ids = Assignment.objects.filter(
-                order=order
-            ).values_list('employee_id', flat=True)
-            
-            logger.info(f"Found {len(assigned_employee_ids)} already assigned employees")
+            # Đơn có thể giao việc: đọc danh sách đã tính trước (tính và lưu nếu chưa có)
+            cached = RecommendationCache.get(pk)
+            if cached is None:
+                order = Order.objects.select_related('customer').get(id=pk)
+                if order.can_assign_employee():
+                    cached = RecommendationCache.compute(order)
+            if cached is not None:
+                logger.info(f"Returning {len(cached)} cached recommendations")
+                if limit is None:
+                    return Response(cached)
+                return Response({
+                    'count': len(cached),
+                    'limit': limit,
+                    'offset': offset,
+                    'results': cached[offset:offset + limit],
+                })
+
+            employees = RecommendationCache.candidate_employees(order)
+
+            if limit is not None:
+                # Top-K: chỉ tạo lý do và serialize cho các dòng được trả về
+                recommendations, count = RecommendationService.top_candidates(
+                    order, employees, limit=limit, offset=offset
+                )
+                logger.info(f"Returning {len(recommendations)} of {count} recommendations")
+                prefetch_related_objects(
+                    [match['employee'] for match in recommendations], 'employeeskill_set__skill'
+                )
+                serializer = RecommendationSerializer(recommendations, many=True)
+                return Response({
+                    'count': count,
+                    'limit': limit,
+                    'offset': offset,
+                    'results': serializer.data,
+                })
+
+            # Chấm điểm toàn bộ ứng viên trong một lượt
+            scored = RecommendationService.score_candidates(order, employees)
+            logger.info(f"Scored {len(scored)} active employees not yet assigned")
+
+            recommendations = [match for match in scored if match['score'] > 0]
 
-            employees = Employee.objects.filter(
-                status='1'
-            ).exclude(
-                id__in=assigned_employee_ids
-            )
-            
-            logger.info(f"Found {len(employees)} active employees not yet assigned")
-            
-            recommendations = []
-            
-            for employee in employees:
-                score = RecommendationService.calculate_match_score(employee, order)
-                logger.info(f"Match score for employee {employee.first_name} {employee.last_name}: {score}")
-                
-                if score > 0:
-                    recommendations.append({
-                        'employee': employee,
-                        'score': score,
-                        'reasons': RecommendationService.get_match_reasons(employee, order)
-                    })
-            
             logger.info(f"Found {len(recommendations)} recommendations")
             
             # Sắp xếp theo điểm số từ cao xuống thấp
             recommendations.sort(key=lambda x: x['score'], reverse=True)
-            
+
+            prefetch_related_objects(
+                [match['employee'] for match in recommendations], 'employeeskill_set__skill'
+            )
             serializer = RecommendationSerializer(recommendations, many=True)
             return Response(serializer.data)
             
@@ -73,4 +108,51 @@ class RecommendationViewSet(ViewSet):
             return Response({'error': 'Order not found'}, status=404)
         except Exception as e:
             logger.error(f"Error getting recommendations: {str(e)}", exc_info=True)
-            return Response({'error': str(e)}, status=500)
\ No newline at end of file
+            return Response({'error': str(e)}, status=500)
+
+    @action(detail=False, methods=['post'], url_path='assign-orders')
+    def assign_orders(self, request):
+        """
+        Assign every PAID/CONFIRMED order in a time window at once (min-cost assignment)
+
+        Body: {"start": ISO datetime, "end": ISO datetime, "dry_run": false}
+        """
+        try:
+            bounds = {}
+            for name in ('start', 'end'):
+                value = request.data.get(name)
+                if not value:
+                    bounds[name] = None
+                    continue
+                try:
+                    bounds[name] = parse_datetime(str(value))
+                except ValueError:
+                    bounds[name] = None
+                # Giá trị không hợp lệ không được biến thành khoảng thời gian không giới hạn
+                if bounds[name] is None:
+                    return Response({'error': f'{name} must be an ISO datetime'}, status=400)
+            start, end = bounds['start'], bounds['end']
+            if start and end and start >= end:
+                return Response({'error': 'start must be before end'}, status=400)
+            dry_run = str(request.data.get('dry_run', False)).lower() in ('1', 'true')
+
+            orders = AssignmentOptimizer.assignable_orders(start=start, end=end)
+            plan = AssignmentOptimizer.plan(orders, AssignmentOptimizer.active_employees())
+            if not dry_run:
+                plan = AssignmentOptimizer.apply(plan)
+
+            return Response({
+                'dry_run': dry_run,
+                'assigned': len(plan),
+                'assignments': [
+                    {
+                        'order': str(match['order'].id),
+                        'employee': str(match['employee'].id),
+                        'score': match['factors']['total'],
+                    }
+                    for match in plan
+                ],
+            })
+        except Exception as e:
+            logger.error(f"Error assigning orders: {str(e)}", exc_info=True)
+            return Response({'error': str(e)}, status=500)
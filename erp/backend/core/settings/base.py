@@ -313,21 +313,31 @@ WSGI_APPLICATION = "core.wsgi.application"
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 # https://docs.djangoproject.com/en/5.0/ref/databases/#mysql-notes
 DB_NAME = os.environ["DB_NAME"] if "DB_NAME" in os.environ else env("DB_NAME")
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.mysql",
-        "NAME": DB_NAME,
-        "USER": os.environ["DB_USER"] if "DB_USER" in os.environ else env("DB_USER"),
-        "PASSWORD": (
-            os.environ["DB_PASSWORD"]
-            if "DB_PASSWORD" in os.environ
-            else env("DB_PASSWORD")
-        ),
-        "HOST": os.environ["DB_HOST"] if "DB_HOST" in os.environ else env("DB_HOST"),
-        "PORT": os.environ["DB_PORT"] if "DB_PORT" in os.environ else env("DB_PORT"),
-        "OPTIONS": {"charset": "utf8mb4"},
+# DB_ENGINE=sqlite: chạy local/benchmark trên file SQLite thay vì MySQL
+DB_ENGINE = env.str("DB_ENGINE", default="mysql")
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": join(BASE_DIR, f"{DB_NAME}.sqlite3"),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.mysql",
+            "NAME": DB_NAME,
+            "USER": os.environ["DB_USER"] if "DB_USER" in os.environ else env("DB_USER"),
+            "PASSWORD": (
+                os.environ["DB_PASSWORD"]
+                if "DB_PASSWORD" in os.environ
+                else env("DB_PASSWORD")
+            ),
+            "HOST": os.environ["DB_HOST"] if "DB_HOST" in os.environ else env("DB_HOST"),
+            "PORT": os.environ["DB_PORT"] if "DB_PORT" in os.environ else env("DB_PORT"),
+            "OPTIONS": {"charset": "utf8mb4"},
+        }
     }
-}
 
 AUTH_USER_MODEL = "oauth.User"
 OAUTH2_PROVIDER_APPLICATION_MODEL = "oauth.Application"
@@ -570,6 +580,16 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Recommendation audit: ghi DecisionLog cho mỗi lượt chấm điểm đề xuất nhân viên
+RECOMMENDATION_AUDIT = env.bool("RECOMMENDATION_AUDIT", default=False)
+RECOMMENDATION_AUDIT_BACKGROUND = env.bool("RECOMMENDATION_AUDIT_BACKGROUND", default=True)
+
+# Tính trước danh sách đề xuất khi đơn chuyển sang PAID/CONFIRMED (thread nền)
+RECOMMENDATION_PRECOMPUTE = env.bool("RECOMMENDATION_PRECOMPUTE", default=True)
+
+# Số JWT đã verify được giữ claims trong bộ nhớ mỗi process (0 = tắt cache)
+OAUTH_CLAIMS_CACHE_SIZE = env.int("OAUTH_CLAIMS_CACHE_SIZE", default=10000)
+
 # Payment Events Configuration
 PAYMENT_EVENTS = {
     'PAYMENT_PENDING': 'payment.pending',
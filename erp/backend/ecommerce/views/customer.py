@@ -1,6 +1,7 @@
 import json
 from django.http import HttpResponse
 from django.db import transaction
+from django.db.models import Prefetch
 from django.contrib.auth.hashers import make_password
 from django.utils.translation import gettext as _
 from django.contrib.auth import get_user_model
@@ -21,7 +22,6 @@ from drf_nested_forms.utils import NestedForm
 from oauthlib.oauth2.rfc6749.utils import list_to_scope
 from oauth2_provider.views.mixins import OAuthLibMixin
 from oauth2_provider.signals import app_authorized
-from oauth2_provider.models import get_access_token_model
 from django.contrib.auth import get_user_model
 from common.constants import Http
 from oauth.constants import AccountStatus
@@ -34,12 +34,14 @@ from base.views.base import BaseViewSet
 from base.services import Verification
 from oauth.serializers import UserShortSerializer
 from oauth.permissions import IsAdministrator
+from oauth.oauth_validators import issued_access_token
+from oauth.role_scopes import RoleScopeCache
+from businesses.models import Employee
 from ..models import Customer
 from ..serializers import CustomerSerializer
 from ..services import CustomerService
 
 User = get_user_model()
-AccessToken = get_access_token_model()
 
 class CustomerViewSet(OAuthLibMixin, BaseViewSet):
     queryset = Customer.objects.all()
@@ -218,7 +220,11 @@ class CustomerViewSet(OAuthLibMixin, BaseViewSet):
     def login(self, request, pk=None):
         try:
             user_name = request.POST.get("username")
-            user = User.objects.prefetch_related("customers").get(email=user_name)
+            user = User.objects.prefetch_related(
+                "customers",
+                # Cùng thứ tự với employees.first(); roles dùng cho RoleScopeCache khi chưa có cache
+                Prefetch("employees", queryset=Employee.objects.order_by("pk").prefetch_related("roles")),
+            ).get(email=user_name)
         except User.DoesNotExist:
             return Response(
                     {"error": _("The user does not exist.")},
@@ -227,11 +233,9 @@ class CustomerViewSet(OAuthLibMixin, BaseViewSet):
         scopes = set()
         # Employee permissions
         if user.customers:
-            employee = user.employees.first()
+            employee = next(iter(user.employees.all()), None)
             if employee is not None:
-                if employee.roles is not None:
-                    for role in  employee.roles.all():
-                        scopes = scopes.union(set(role.scopes.keys()))
+                scopes = set(RoleScopeCache.employee_scopes(employee))
            
         request.POST._mutable = True
         request.POST.update(
@@ -249,8 +253,9 @@ class CustomerViewSet(OAuthLibMixin, BaseViewSet):
         if status == 200:
             access_token = json.loads(body).get("access_token")
             if access_token is not None:
-                token = AccessToken.objects.get(token=access_token)
-                app_authorized.send(sender=self, request=request, token=token)
+                token = issued_access_token(access_token)
+                if token is not None:
+                    app_authorized.send(sender=self, request=request, token=token)
         response = HttpResponse(content=body, status=status)
 
         for k, v in headers.items():
@@ -278,8 +283,9 @@ class CustomerViewSet(OAuthLibMixin, BaseViewSet):
         if status == 200:
             access_token = json.loads(body).get("access_token")
             if access_token is not None:
-                token =AccessToken.objects.get(token=access_token)
-                app_authorized.send(sender=self, request=request, token=token)
+                token = issued_access_token(access_token)
+                if token is not None:
+                    app_authorized.send(sender=self, request=request, token=token)
         response = HttpResponse(content=body, status=status)
 
         for k, v in headers.items():
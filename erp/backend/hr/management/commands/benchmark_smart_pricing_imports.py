@@ -0,0 +1,69 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Chạy trong một interpreter mới cho mỗi lần đo để không bị ảnh hưởng bởi module đã import sẵn
+PROBE = """
+import json, os, resource, sys, time
+import django
+django.setup()
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - started
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "rss_kib": rss_after - rss_before,
+    "heavy": [name for name in ("pandas", "matplotlib", "tqdm") if name in sys.modules],
+}))
+"""
+
+SCENARIOS = [
+    ("serving path (smart_pricing_service)", ["hr.services.smart_pricing_service"]),
+    (
+        "+ training deps (old module-level imports)",
+        ["hr.services.smart_pricing_service", "pandas", "tqdm", "matplotlib.pyplot"],
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the import time and resident memory that hr.services.smart_pricing_service adds to a "
+        "web worker, compared with also importing the training-only dependencies"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters per scenario")
+
+    def handle(self, *args, **options):
+        if options["runs"] < 1:
+            raise CommandError("--runs must be positive")
+
+        env = dict(os.environ)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "core.settings.base")
+        env.setdefault("MPLBACKEND", "Agg")
+
+        self.stdout.write(f"{'scenario':<44} {'import ms':>10} {'RSS MiB':>8}  heavy modules")
+        for name, modules in SCENARIOS:
+            samples = []
+            for _ in range(options["runs"]):
+                result = subprocess.run(
+                    [sys.executable, "-c", PROBE, *modules],
+                    capture_output=True, text=True, env=env, cwd=os.getcwd(),
+                )
+                if result.returncode != 0:
+                    raise CommandError(f"Import probe failed for {name}:\n{result.stderr}")
+                samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+            self.stdout.write(
+                f"{name:<44} {statistics.median(sample['ms'] for sample in samples):>10.1f} "
+                f"{statistics.median(sample['rss_kib'] for sample in samples) / 1024:>8.1f}  "
+                f"{', '.join(samples[-1]['heavy']) or '-'}"
+            )
@@ -0,0 +1,24 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from hr.services.smart_pricing_service import QAgent, SmartPricingTrainer
+
+
+class Command(BaseCommand):
+    help = "Chuyển Q-agent Smart Pricing dạng pickle (dict) sang Q-table NumPy (.npy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=SmartPricingTrainer.LEGACY_MODEL_PATH, help="Pickled QAgent")
+        parser.add_argument("--target", default=SmartPricingTrainer.MODEL_PATH, help="Output .npy Q-table")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["source"]):
+            raise CommandError(f"{options['source']} doesn't exist")
+
+        agent = QAgent.from_pickle(options["source"], len(SmartPricingTrainer.ACTIONS))
+        os.makedirs(os.path.dirname(options["target"]) or ".", exist_ok=True)
+        agent.save(options["target"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Converted {len(agent.learned_states())} states to {options['target']}"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from hr.services.smart_pricing_service import SmartPricingTrainer
+
+
+class Command(BaseCommand):
+    help = "Export dữ liệu SmartPricing sang các shard .npz (mặc định chỉ các dòng mới)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Xóa các shard cũ và export lại toàn bộ")
+        parser.add_argument("--chunk-size", type=int, default=SmartPricingTrainer.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        exported = SmartPricingTrainer().export_data_from_db(
+            incremental=not options["full"], chunk_size=options["chunk_size"]
+        )
+        if exported is None:
+            raise CommandError("Export failed")
+        self.stdout.write(self.style.SUCCESS(f"✅ Exported {exported} records"))
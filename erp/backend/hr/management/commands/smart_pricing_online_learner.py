@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from hr.services.smart_pricing_service import SmartPricingOnlineLearner
+
+
+class Command(BaseCommand):
+    help = (
+        "Continuously learn from decided Smart Pricing quotes and checkpoint the Q-table. "
+        "Run exactly one instance: this is the only online writer of the model file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Learn the quotes decided so far, checkpoint and exit")
+
+    def handle(self, *args, **options):
+        learner = SmartPricingOnlineLearner()
+        self.stdout.write("🚀 Smart Pricing online learner started")
+        learner.run(once=options["once"])
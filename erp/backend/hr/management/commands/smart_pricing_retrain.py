@@ -18,6 +18,8 @@ def retrain_job():
         logger.info(msg)
 
         trainer = SmartPricingTrainer()
+        # Chỉ export các báo giá mới kể từ lần chạy trước
+        trainer.export_data_from_db(incremental=True)
         trainer.train_model()
 
         print("✅ Completed retrain Smart Pricing")
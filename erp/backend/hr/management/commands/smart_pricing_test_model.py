@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 import numpy as np
-import pickle
+from hr.services.smart_pricing_service import QAgent, SmartPricingPredictor
 
 class CleaningPricingEnv:
     def __init__(self):
@@ -21,7 +21,7 @@ def suggest_price(agent, env, service_type, hour_peak, customer_history, area_m2
     state = (service_type, hour_peak, min(customer_history, 5), area_level)
     print("📘 State:", state)
 
-    q_values = agent.Q.get(state, np.zeros(len(env.actions)))
+    q_values = agent.Q[agent.encode_state(state)] if agent.knows(state) else np.zeros(len(env.actions))
     best_action_idx = np.argmax(q_values)
     delta = env.actions[best_action_idx]
 
@@ -41,8 +41,7 @@ class Command(BaseCommand):
     help = "Test mô hình Q-learning đã train"
 
     def handle(self, *args, **options):
-        with open("../ml_models/q_agent_pricing.pkl", "rb") as f:
-            agent = pickle.load(f)
+        agent = QAgent.load(SmartPricingPredictor.MODEL_PATH)
 
         env = CleaningPricingEnv()
 
@@ -0,0 +1,185 @@
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from hr.services.smart_pricing_service import (
+    QAgent, SmartPricingTrainer, model_file_lock, model_file_stamp,
+)
+
+
+def _float_list(value):
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def fit(agent, states, actions, rewards, epochs):
+    """
+    Cùng vòng lặp với `SmartPricingTrainer.train_model`: mỗi epoch là một hoán vị của dữ liệu
+    (RandomState(epoch), giống df.sample(frac=1, random_state=epoch)) và các cặp (i, i+1).
+    """
+    for epoch in range(epochs):
+        order = np.random.RandomState(epoch).permutation(len(states))
+        current, following = order[:-1], order[1:]
+        agent.learn_sequence(states[current], actions[current], rewards[current], states[following])
+    return agent
+
+
+def train_config(data_dir, alpha, gamma, epochs):
+    """Train one configuration from scratch on the memory-mapped training arrays (chạy trong process con)."""
+    states = np.load(os.path.join(data_dir, "states.npy"), mmap_mode="r")
+    actions = np.load(os.path.join(data_dir, "actions.npy"), mmap_mode="r")
+    rewards = np.load(os.path.join(data_dir, "rewards.npy"), mmap_mode="r")
+
+    agent = QAgent(action_size=len(SmartPricingTrainer.ACTIONS), alpha=alpha, gamma=gamma)
+    return fit(agent, states, actions, rewards, epochs).Q
+
+
+def score_key(scores):
+    """Thứ tự so sánh kết quả đánh giá: expected_reward rồi acceptance_rate."""
+    return scores['expected_reward'], scores['acceptance_rate']
+
+
+def evaluate(Q, states, actions, rewards, accepted):
+    """
+    Offline evaluation on held-out rows (replay): chỉ các dòng có action đã ghi nhận trùng với
+    action greedy của policy được tính. State chưa học dùng action trung tính (0.0).
+
+    Returns:
+        dict: expected_reward, acceptance_rate, coverage (tỉ lệ dòng khớp)
+    """
+    neutral = SmartPricingTrainer.ACTIONS.index(0.0)
+    rows = Q[states]
+    learned = ~np.isnan(rows[:, 0])
+    policy_actions = np.where(learned, np.argmax(np.nan_to_num(rows, nan=-np.inf), axis=1), neutral)
+    matched = policy_actions == actions
+    if not matched.any():
+        return {'expected_reward': float('-inf'), 'acceptance_rate': 0.0, 'coverage': 0.0}
+    return {
+        'expected_reward': float(rewards[matched].mean()),
+        'acceptance_rate': float(accepted[matched].mean()),
+        'coverage': float(matched.mean()),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Train several Smart Pricing agent configurations in parallel and evaluate them on a held-out "
+        "split, then continue training the current model with the best configuration and save it to "
+        "MODEL_PATH unless it scores worse than the current model on the same held-out split"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alphas", default="0.05,0.1,0.2")
+        parser.add_argument("--gammas", default="0.8,0.9,0.95")
+        parser.add_argument("--epochs", default="50,100")
+        parser.add_argument("--holdout", type=float, default=0.2, help="Tỉ lệ dữ liệu mới nhất dùng để đánh giá")
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--dry-run", action="store_true", help="Chỉ chọn cấu hình, không retrain/ghi đè model")
+
+    def handle(self, *args, **options):
+        if not 0 < options["holdout"] < 1:
+            raise CommandError("--holdout must be between 0 and 1")
+
+        trainer = SmartPricingTrainer()
+        df = trainer.load_data()
+        if df is None or len(df) < trainer.MIN_SAMPLES:
+            raise CommandError(f"At least {trainer.MIN_SAMPLES} samples are required")
+
+        df = trainer.prepare_training_data(df)
+        # Tách theo thời gian: phần mới nhất để đánh giá
+        if 'created_at' in df.columns:
+            df = df.sort_values('created_at', kind='stable')
+        df = df.reset_index(drop=True)
+        states, actions, rewards = trainer.encode_transitions(df)
+        accepted = df['accepted_status'].fillna(0).astype(float).to_numpy() == 1
+
+        split = int(len(df) * (1 - options["holdout"]))
+        if split < 2 or split == len(df):
+            raise CommandError("Not enough rows for the train/held-out split")
+
+        configs = list(itertools.product(
+            _float_list(options["alphas"]), _float_list(options["gammas"]), _int_list(options["epochs"])
+        ))
+        self.stdout.write(
+            f"Training {len(configs)} configurations on {split} rows, evaluating on {len(df) - split} rows"
+        )
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            # Các process con đọc chung dữ liệu train qua memory mapping
+            np.save(os.path.join(data_dir, "states.npy"), states[:split])
+            np.save(os.path.join(data_dir, "actions.npy"), actions[:split])
+            np.save(os.path.join(data_dir, "rewards.npy"), rewards[:split])
+
+            with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+                futures = [
+                    executor.submit(train_config, data_dir, alpha, gamma, epochs)
+                    for alpha, gamma, epochs in configs
+                ]
+                tables = [future.result() for future in futures]
+
+        results = []
+        for (alpha, gamma, epochs), Q in zip(configs, tables):
+            scores = evaluate(Q, states[split:], actions[split:], rewards[split:], accepted[split:])
+            results.append(((alpha, gamma, epochs), Q, scores))
+            self.stdout.write(
+                f"alpha={alpha:<5} gamma={gamma:<5} epochs={epochs:<4} "
+                f"reward={scores['expected_reward']:>14,.0f} acceptance={scores['acceptance_rate']:.1%} "
+                f"coverage={scores['coverage']:.1%}"
+            )
+
+        (alpha, gamma, epochs), _, scores = max(results, key=lambda result: score_key(result[2]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Best: alpha={alpha} gamma={gamma} epochs={epochs} "
+            f"(reward {scores['expected_reward']:,.0f}, acceptance {scores['acceptance_rate']:.1%})"
+        ))
+
+        if options["dry_run"]:
+            return
+
+        # Sweep chỉ dùng để chọn (alpha, gamma, epochs): model đưa vào dùng được học tiếp từ Q-table
+        # hiện tại trên phần train, rồi chính bảng đó được so với model hiện tại trên phần held-out
+        config = (alpha, gamma, epochs)
+        loaded_stamp = model_file_stamp(trainer.MODEL_PATH)
+        agent, current, retrained = self.retrain(trainer, config, split, states, actions, rewards, accepted)
+        with model_file_lock(trainer.MODEL_PATH):
+            if model_file_stamp(trainer.MODEL_PATH) != loaded_stamp:
+                # Model đã được ghi trong lúc retrain (online learner, ...): retrain lại trên bản mới nhất
+                self.stdout.write("Model file changed during retraining, retraining on the latest Q-table")
+                agent, current, retrained = self.retrain(trainer, config, split, states, actions, rewards, accepted)
+            self.stdout.write(
+                f"Held-out: current model reward={current['expected_reward']:,.0f} "
+                f"acceptance={current['acceptance_rate']:.1%}, retrained reward={retrained['expected_reward']:,.0f} "
+                f"acceptance={retrained['acceptance_rate']:.1%}"
+            )
+            if score_key(retrained) < score_key(current):
+                self.stdout.write(self.style.WARNING(
+                    "Retrained model scores worse than the current model on the held-out split; not saved"
+                ))
+                return
+            agent.save(trainer.MODEL_PATH)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Retrained the current model on {split} rows with the best configuration and saved it to "
+            f"{trainer.MODEL_PATH}"
+        ))
+
+    @staticmethod
+    def retrain(trainer, config, split, states, actions, rewards, accepted):
+        """
+        Continue training the current Q-table on the train split with `config`.
+
+        Returns:
+            tuple: (agent, điểm held-out của model hiện tại, điểm held-out của bảng vừa train)
+        """
+        alpha, gamma, epochs = config
+        held_out = (states[split:], actions[split:], rewards[split:], accepted[split:])
+        agent = trainer.load_agent()
+        current = evaluate(agent.Q, *held_out)
+        agent.alpha, agent.gamma = alpha, gamma
+        fit(agent, states[:split], actions[:split], rewards[:split], epochs)
+        return agent, current, evaluate(agent.Q, *held_out)
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0011_invoice_smartpricing_alter_order_options_and_more'),
+        ('hr', '0011_smart_pricing_delete_smartpricing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smart_pricing',
+            name='decided_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='smart_pricing',
+            name='learned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
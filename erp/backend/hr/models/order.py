@@ -17,6 +17,8 @@ class Order(TimeStampedModel):
         ('REJECTED', 'Từ chối'),
         ('REFUND', 'Hoàn tiền'),
     ]
+    # Các trạng thái có thể giao việc cho nhân viên
+    ASSIGNABLE_STATUSES = ['PAID', 'CONFIRMED']
     
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
     service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name='orders')
@@ -61,7 +63,8 @@ class Order(TimeStampedModel):
     
     def can_assign_employee(self):
         """Check xem có thể giao việc cho nhân viên không"""
-        return self.status in ['PAID', 'CONFIRMED']
+        # updateStatus lưu trạng thái chữ thường ('confirmed')
+        return (self.status or '').upper() in self.ASSIGNABLE_STATUSES
 
 class Assignment(TimeStampedModel):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from base.models import TimeStampedModel
 from .customer import Customer, ServiceType
 from businesses.models.employee import Employee
@@ -15,9 +16,21 @@ class Smart_Pricing(TimeStampedModel):
     price_adjustment = models.DecimalField(default=0,max_digits=5, decimal_places=2)  
     accepted_status = models.BooleanField(default=False)  
     reward = models.DecimalField(default=0,max_digits=10, decimal_places=2)  
+    # Thời điểm ghi kết quả (record_outcome); null = khách chưa quyết định
+    decided_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Thời điểm online learner đã học báo giá này (xem SmartPricingOnlineLearner)
+    learned_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "hr_smartpricing"
 
+    def record_outcome(self, accepted, reward=None):
+        """Ghi kết quả của báo giá; online learner học báo giá đúng một lần sau bước này."""
+        self.accepted_status = accepted
+        if reward is not None:
+            self.reward = reward
+        self.decided_at = timezone.now()
+        self.save(update_fields=['accepted_status', 'reward', 'decided_at', 'updated_at'])
+
     def __str__(self):
         return f"SmartPricing({self.service_type}, {self.proposed_price} VND)"
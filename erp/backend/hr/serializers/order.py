@@ -4,6 +4,7 @@ from ..models.customer import Customer, ServiceType
 from businesses.serializers.employee import EmployeeShortSerializer
 from businesses.serializers.employee import EmployeeShortSerializer
 from .customer import CustomerSerializer, ServiceTypeSerializer
+from ..services.service_type_catalogue import ServiceTypeCatalogue
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -18,7 +19,8 @@ class ServiceTypeSerializer(serializers.ModelSerializer):
 
 class OrderSerializer(serializers.ModelSerializer):
     customer_details = CustomerSerializer(source='customer', read_only=True)
-    service_details = ServiceTypeSerializer(source='service_type', read_only=True)
+    # Đọc ServiceType từ catalogue trong process, không query theo từng đơn
+    service_details = serializers.SerializerMethodField(read_only=True)
     payment_method = serializers.ChoiceField(
         choices=['CASH', 'BANK_TRANSFER'],
         default='CASH',
@@ -33,6 +35,10 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = '__all__'
     
+    def get_service_details(self, obj):
+        service_type = ServiceTypeCatalogue.get(obj.service_type_id)
+        return ServiceTypeSerializer(service_type, context=self.context).data if service_type else None
+
     def get_payment_method_display(self, obj):
         """Lấy payment method từ bảng Payment"""
         try:
@@ -70,6 +76,7 @@ class OrderEmployeeSerializer(serializers.ModelSerializer):
         
     def to_representation(self, instance):
         try:
+            service_type = ServiceTypeCatalogue.get(instance.service_type_id)
             # Trả về full representation để frontend có đủ thông tin
             data = {
                 'id': instance.id,
@@ -84,9 +91,9 @@ class OrderEmployeeSerializer(serializers.ModelSerializer):
                 'note': instance.note,
                 'created_at': instance.created_at,
                 'customer': instance.customer.id if instance.customer else None,
-                'service_type': instance.service_type.id if instance.service_type else None,
+                'service_type': instance.service_type_id,
                 'customer_details': CustomerSerializer(instance.customer).data if instance.customer else None,
-                'service_details': ServiceTypeSerializer(instance.service_type).data if instance.service_type else None,
+                'service_details': ServiceTypeSerializer(service_type).data if service_type else None,
             }
             return data
         except ValueError as e:
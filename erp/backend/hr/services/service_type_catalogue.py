@@ -0,0 +1,59 @@
+import threading
+import time
+
+from hr.models.customer import ServiceType
+
+
+class ServiceTypeCatalogue:
+    """
+    Process-wide cache of every ServiceType row (bảng nhỏ, hiếm khi ghi).
+
+    - Load toàn bộ bằng một query ở lần đọc đầu tiên.
+    - ServiceType được lưu/xóa thì load lại ở lần đọc sau (xem `hr.signals`).
+    - Tự load lại sau TTL_SECONDS để bù cho các thay đổi không đi qua signal (worker khác, ...).
+
+    Các instance trả về được dùng chung giữa các request, chỉ dùng để đọc.
+    """
+    TTL_SECONDS = 300
+
+    _lock = threading.RLock()
+    _loaded_at = None
+    _by_id = {}  # id -> ServiceType
+
+    @classmethod
+    def get(cls, service_type_id):
+        """ServiceType theo id (chuyển kiểu như `filter(id=...)`), None nếu không có hoặc id không hợp lệ."""
+        if service_type_id is None:
+            return None
+        try:
+            key = ServiceType._meta.pk.to_python(service_type_id)
+        except Exception:
+            return None
+        with cls._lock:
+            cls._ensure_loaded()
+            return cls._by_id.get(key)
+
+    @classmethod
+    def all(cls):
+        with cls._lock:
+            cls._ensure_loaded()
+            return list(cls._by_id.values())
+
+    @classmethod
+    def refresh(cls):
+        """Reload every ServiceType from the database."""
+        by_id = {service_type.id: service_type for service_type in ServiceType.objects.all()}
+        with cls._lock:
+            cls._by_id = by_id
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls):
+        """Force a reload on the next read."""
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def _ensure_loaded(cls):
+        if cls._loaded_at is None or time.monotonic() - cls._loaded_at > cls.TTL_SECONDS:
+            cls.refresh()
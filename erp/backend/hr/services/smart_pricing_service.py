@@ -1,32 +1,122 @@
-import pandas as pd
 from hr.models.smartpricing import Smart_Pricing
-from hr.models.customer import ServiceType
 from hr.models.customer import Customer
+from hr.services.service_type_catalogue import ServiceTypeCatalogue
+import hashlib
+import json
 import pickle
 import numpy as np
 import random
 import os
 import logging
-from tqdm import tqdm
-import matplotlib.pyplot as plt
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+# pandas, tqdm và matplotlib chỉ dùng khi train nên được import trong hàm: web worker
+# (SmartPricingView -> SmartPricingPredictor) chỉ cần NumPy.
 
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def model_file_lock(path):
+    """
+    Khóa độc quyền (flock trên `<path>.lock`) quanh việc ghi file model.
+
+    train_model, sweep và online learner đều ghi MODEL_PATH. Mỗi bên ghi lại `model_file_stamp`
+    lúc load Q-table và kiểm tra lại trong khóa trước khi ghi: nếu file đã đổi, Q-table mới nhất
+    được load và phần học của mình được chạy lại trên đó (learner học lại các batch chưa
+    checkpoint, train_model/sweep train lại), nên không ghi đè model mà process khác vừa lưu.
+    """
+    import fcntl
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def model_file_stamp(path):
+    """(mtime_ns, size) of the model file, None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 class QAgent:
-    """Q-learning agent (tabular)."""
-    def __init__(self, action_size, alpha=0.1, gamma=0.9, epsilon=0.2):
-        self.Q = {}  # dict: state -> list of Q for each action
+    """
+    Q-learning agent (tabular) trên một Q-table NumPy dày.
+
+    State (service, hours_peak, loyalty level, area level) được mã hóa thành một chỉ số dòng
+    theo STATE_SHAPE; mỗi dòng là Q của các action. Dòng NaN là state chưa được học.
+    Q-table được lưu thành file .npy và load bằng memory mapping.
+    """
+    STATE_SHAPE = (2, 2, 5, 3)  # service, hours_peak, loyalty level (0-4), area level (0-2)
+
+    def __init__(self, action_size, alpha=0.1, gamma=0.9, epsilon=0.2, Q=None):
+        if Q is None:
+            Q = np.full((int(np.prod(self.STATE_SHAPE)), action_size), np.nan)
+        self.Q = Q  # ndarray: encoded state -> Q của từng action
         self.action_size = action_size
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
 
+    @classmethod
+    def in_range(cls, state):
+        """Whether every feature of the state lies inside STATE_SHAPE (vd. service_type_id mới thì không)."""
+        return len(state) == len(cls.STATE_SHAPE) and all(
+            0 <= int(value) < size for value, size in zip(state, cls.STATE_SHAPE)
+        )
+
+    @classmethod
+    def valid_states(cls, *columns):
+        """Vectorized `in_range`: mask các dòng có state nằm trong STATE_SHAPE."""
+        mask = np.ones(len(np.asarray(columns[0])), dtype=bool)
+        for column, size in zip(columns, cls.STATE_SHAPE):
+            column = np.asarray(column, dtype=np.int64)
+            mask &= (column >= 0) & (column < size)
+        return mask
+
+    @classmethod
+    def encode_state(cls, state):
+        """Chỉ số dòng của một state; ValueError nếu state nằm ngoài STATE_SHAPE (xem `in_range`)."""
+        return int(np.ravel_multi_index(tuple(int(value) for value in state), cls.STATE_SHAPE))
+
+    @classmethod
+    def decode_state(cls, index):
+        return tuple(int(value) for value in np.unravel_index(index, cls.STATE_SHAPE))
+
+    @classmethod
+    def encode_states(cls, *columns):
+        """
+        Vectorized `encode_state` cho các cột service, hours_peak, loyalty level, area level.
+        ValueError nếu có dòng ngoài STATE_SHAPE; lọc trước bằng `valid_states`.
+        """
+        columns = tuple(np.asarray(column, dtype=np.int64) for column in columns)
+        return np.ravel_multi_index(columns, cls.STATE_SHAPE)
+
+    def knows(self, state):
+        """Whether the state has been learned (state ngoài STATE_SHAPE coi như chưa học)."""
+        return self.in_range(state) and not np.isnan(self.Q[self.encode_state(state), 0])
+
     def get_Q(self, state):
-        """Return Q-list for state, initialize to zeros if missing."""
-        if state not in self.Q:
-            self.Q[state] = [0.0] * self.action_size
-        return self.Q[state]
+        """Return Q-row for state, initialize to zeros if missing."""
+        row = self.encode_state(state)
+        if np.isnan(self.Q[row, 0]):
+            self.Q[row] = 0.0
+        return self.Q[row]
+
+    def learned_states(self):
+        """[(state, Q-row)] of every learned state."""
+        rows = np.flatnonzero(~np.isnan(self.Q[:, 0]))
+        return [(self.decode_state(row), self.Q[row]) for row in rows]
 
     def choose_action(self, state):
         """Epsilon-greedy action selection."""
@@ -36,10 +126,63 @@ class QAgent:
 
     def learn(self, state, action, reward, next_state):
         """Q-learning update."""
-        current_q = self.get_Q(state)[action]
-        next_max = max(self.get_Q(next_state))
+        current_q = float(self.get_Q(state)[action])
+        next_max = float(np.max(self.get_Q(next_state)))
         new_q = current_q + self.alpha * (reward + self.gamma * next_max - current_q)
-        self.Q[state][action] = new_q
+        self.Q[self.encode_state(state), action] = new_q
+
+    def learn_sequence(self, states, actions, rewards, next_states):
+        """
+        Apply `learn` to every transition in order (states/next_states là chỉ số đã mã hóa).
+
+        Vòng lặp chạy trên list Python thay vì từng dòng pandas; phép tính và thứ tự cập nhật
+        giống hệt gọi `learn` tuần tự nên Q-values không đổi.
+        """
+        touched = np.union1d(states, next_states)
+        self.Q[touched[np.isnan(self.Q[touched, 0])]] = 0.0
+
+        table = self.Q.tolist()
+        alpha, gamma = self.alpha, self.gamma
+        for state, action, reward, next_state in zip(
+            states.tolist(), actions.tolist(), rewards.tolist(), next_states.tolist()
+        ):
+            row = table[state]
+            current_q = row[action]
+            row[action] = current_q + alpha * (reward + gamma * max(table[next_state]) - current_q)
+        self.Q[:] = table
+
+    def save(self, path):
+        """Ghi Q-table ra file .npy (qua file tạm + os.replace để người đọc không thấy file ghi dở)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(self.Q, dtype=np.float64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a saved Q-table; mmap=True maps the file read-only (dùng cho dự đoán)."""
+        Q = np.load(path, mmap_mode='r' if mmap else None)
+        if not mmap:
+            Q = np.array(Q, dtype=np.float64)
+        return cls(action_size=Q.shape[1], Q=Q)
+
+    @classmethod
+    def from_pickle(cls, path, action_size):
+        """Convert a legacy pickled agent whose Q is a dict state-tuple -> list of Q-values."""
+        with open(path, 'rb') as f:
+            old_agent = pickle.load(f)
+        agent = cls(
+            action_size=action_size,
+            alpha=getattr(old_agent, 'alpha', 0.1),
+            gamma=getattr(old_agent, 'gamma', 0.9),
+            epsilon=getattr(old_agent, 'epsilon', 0.2),
+        )
+        for state, q_values in getattr(old_agent, 'Q', {}).items():
+            if not cls.in_range(state):
+                logger.warning(f"Skipping legacy state {state} outside {cls.STATE_SHAPE}")
+                continue
+            agent.Q[agent.encode_state(state)] = q_values
+        return agent
 
 
 class SmartPricingTrainer:
@@ -51,8 +194,32 @@ class SmartPricingTrainer:
     - Nếu có accepted_status trong DB, reward sẽ được (proposed_price - base_rate) khi accepted, ngược lại = 0.
     - Hỗ trợ incremental learning: load Q-table cũ nếu có.
     """
-    MODEL_PATH = "../ml_models/q_agent_pricing.pkl"
-    DATA_CSV = "../ml_models/pricing_training_data.csv"
+    MODEL_PATH = "../ml_models/q_agent_pricing.npy"
+    LEGACY_MODEL_PATH = "../ml_models/q_agent_pricing.pkl"
+    DATA_CSV = "../ml_models/pricing_training_data.csv"  # định dạng cũ, chỉ đọc khi chưa có shard
+    DATA_DIR = "../ml_models/pricing_training_data"
+    PLOT_PATH = "../ml_models/smart_pricing_training.png"
+    EXPORT_CHUNK_SIZE = 10000  # số dòng mỗi shard .npz
+    EXPORT_SETTLE_SECONDS = 300  # bỏ qua các dòng quá mới, transaction có thể chưa commit hết
+    EXPORT_FIELDS = [
+        'service_type_id',
+        'hours_peak',
+        'customer_history_score',
+        'area_m2',
+        'price_adjustment',
+        'reward',
+        'accepted_status',
+        'created_at',
+    ]
+    EXPORT_DTYPES = {
+        'service_type_id': np.int64,
+        'hours_peak': np.int8,
+        'customer_history_score': np.int64,
+        'area_m2': np.float64,
+        'price_adjustment': np.float64,
+        'reward': np.float64,
+        'accepted_status': np.int8,
+    }
     ACTIONS = [-0.2, -0.1, 0.0, 0.1, 0.2]
     MIN_SAMPLES = 100  # tối thiểu mẫu
 
@@ -60,43 +227,133 @@ class SmartPricingTrainer:
     UNIT_PRICE_REGULAR = 40000
     UNIT_PRICE_DEEP = 59000
 
-    def export_data_from_db(self):
-        """Export data from DB to CSV, overwrite cũ. Trả về DataFrame hoặc None."""
+    def export_data_from_db(self, incremental=True, chunk_size=None):
+        """
+        Export Smart_Pricing sang các shard .npz chỉ ghi thêm (append-only) trong DATA_DIR.
+
+        Bảng được đọc theo từng trang keyset trên (created_at, id), mỗi trang chunk_size dòng được
+        ghi thành một shard, nên bộ nhớ không tăng theo số dòng (kể cả với MySQL, nơi iterator()
+        không stream). incremental=True tiếp tục sau (last_created_at, last_id) của lần export
+        trước (lưu trong manifest.json); incremental=False xóa các shard cũ và export lại.
+        Chỉ export các dòng tạo trước EXPORT_SETTLE_SECONDS để báo giá commit muộn không bị bỏ sót.
+        Trả về số dòng đã export hoặc None nếu lỗi.
+        """
+        chunk_size = chunk_size or self.EXPORT_CHUNK_SIZE
         try:
-            qs = Smart_Pricing.objects.all().values(
-                'service_type_id',
-                'hours_peak',
-                'customer_history_score',
-                'area_m2',
-                'price_adjustment',
-                'reward',
-                'accepted_status',
-                'created_at'
-            )
-            df = pd.DataFrame(qs)
+            os.makedirs(self.DATA_DIR, exist_ok=True)
+            if incremental:
+                manifest = self._read_manifest()
+            else:
+                for path in self._shard_paths():
+                    os.remove(path)
+                manifest = {}
+                print(f"Removed old shards in {self.DATA_DIR}")
 
-            if df.empty:
-                print("Database doesn't have SmartPricing data")
-                return None
+            from django.db.models import Q
 
-            os.makedirs(os.path.dirname(self.DATA_CSV), exist_ok=True)
+            cutoff = datetime.now(dt_timezone.utc) - timedelta(seconds=self.EXPORT_SETTLE_SECONDS)
+            base_qs = Smart_Pricing.objects.filter(created_at__lte=cutoff).order_by(
+                'created_at', 'id'
+            ).values_list('id', *self.EXPORT_FIELDS)
 
-            # xóa file cũ nếu có
-            if os.path.exists(self.DATA_CSV):
-                os.remove(self.DATA_CSV)
-                print(f"Removed old data file: {self.DATA_CSV}")
+            exported = 0
+            while True:
+                qs = base_qs
+                if manifest.get('last_created_at'):
+                    last_created_at = datetime.fromisoformat(manifest['last_created_at'])
+                    if manifest.get('last_id'):
+                        qs = qs.filter(
+                            Q(created_at__gt=last_created_at)
+                            | Q(created_at=last_created_at, id__gt=manifest['last_id'])
+                        )
+                    else:
+                        # manifest cũ chưa có last_id
+                        qs = qs.filter(created_at__gt=last_created_at)
+                rows = list(qs[:chunk_size])
+                if not rows:
+                    break
+                self._write_shard([row[1:] for row in rows], manifest, last_id=rows[-1][0])
+                exported += len(rows)
+                if len(rows) < chunk_size:
+                    break
 
-            df.to_csv(self.DATA_CSV, index=False)
-            print(f"Exported {len(df)} records to {self.DATA_CSV}")
-            return df
+            if not exported:
+                print("Database doesn't have new SmartPricing data")
+            else:
+                print(f"Exported {exported} records to {self.DATA_DIR}")
+            return exported
 
         except Exception as e:
             logger.exception("Error exporting data: %s", e)
             print(f"Error exporting data: {e}")
             return None
 
+    def _write_shard(self, rows, manifest, last_id):
+        """Ghi một chunk thành shard .npz rồi cập nhật manifest (export bị ngắt có thể chạy tiếp)."""
+        columns = dict(zip(self.EXPORT_FIELDS, zip(*rows)))
+        arrays = {
+            name: np.array(columns[name], dtype=dtype)
+            for name, dtype in self.EXPORT_DTYPES.items()
+        }
+        arrays['created_at'] = np.array(
+            [
+                value.astimezone(dt_timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+                for value in columns['created_at']
+            ],
+            dtype='datetime64[us]',
+        )
+
+        shard_index = manifest.get('next_shard', 0)
+        path = os.path.join(self.DATA_DIR, f"part-{shard_index:06d}.npz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+        manifest['next_shard'] = shard_index + 1
+        manifest['last_created_at'] = rows[-1][self.EXPORT_FIELDS.index('created_at')].isoformat()
+        manifest['last_id'] = str(last_id)
+        manifest['rows'] = manifest.get('rows', 0) + len(rows)
+        self._write_manifest(manifest)
+
+    def _manifest_path(self):
+        return os.path.join(self.DATA_DIR, "manifest.json")
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path()):
+            return {}
+        with open(self._manifest_path()) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _shard_paths(self):
+        if not os.path.isdir(self.DATA_DIR):
+            return []
+        return sorted(
+            os.path.join(self.DATA_DIR, name)
+            for name in os.listdir(self.DATA_DIR)
+            if name.startswith("part-") and name.endswith(".npz")
+        )
+
     def load_data(self):
-        """Load CSV đã export."""
+        """Load các shard đã export (hoặc file CSV cũ nếu chưa có shard)."""
+        import pandas as pd
+
+        shard_paths = self._shard_paths()
+        if shard_paths:
+            frames = []
+            for path in shard_paths:
+                with np.load(path) as data:
+                    frames.append(pd.DataFrame({name: data[name] for name in data.files}))
+            df = pd.concat(frames, ignore_index=True)
+            print(f"Loaded {len(df)} training samples from {len(shard_paths)} shards")
+            return df
+
         if not os.path.exists(self.DATA_CSV):
             print(f"File {self.DATA_CSV} doesn't exist")
             return pd.DataFrame()
@@ -104,34 +361,33 @@ class SmartPricingTrainer:
         print(f"Loaded {len(df)} training samples from CSV")
         return df
 
-    def _area_level(self, area):
-        """Bucket hóa diện tích để rời rạc hóa state.
+    def _area_levels(self, areas):
+        """Bucket hóa diện tích để rời rạc hóa state (<40: 0, <80: 1, còn lại: 2).
         Ngưỡng này có thể điều chỉnh tùy đặc thù dữ liệu.
         """
-        try:
-            area = float(area)
-        except Exception:
-            # nếu NaN/không hợp lệ -> đặt vào nhóm trung bình
-            return 1
+        return np.digitize(areas.to_numpy(dtype=float), [40, 80])
 
-        if area < 40:
-            return 0
-        elif area < 80:
-            return 1
-        else:
-            return 2
+    def _loyalty_levels(self, scores):
+        """Cấp độ khách hàng của cả cột (xem `_customer_loyalty_level`)."""
+        scores = scores.to_numpy()
+        return np.select(
+            [scores == 0, scores <= 5, scores <= 15, scores <= 30],
+            [0, 1, 2, 3],
+            default=4,
+        )
 
-    def _compute_base_rate(self, service_id, area_m2):
-        """Tính base_rate = unit_price_per_m2 * area_m2"""
-        try:
-            area = float(area_m2)
-        except Exception:
-            area = 0.0
-        
-        service = ServiceType.objects.filter(id=service_id).first()
-        return area * service.price_per_m2 if service else 0.0
+    def _unit_prices(self, service_type_ids):
+        """
+        Đơn giá/m2 của từng dòng, tra trong ServiceTypeCatalogue cho mỗi id khác nhau.
+        Id được chuyển kiểu giống `ServiceType.objects.filter(id=...)`; id không khớp -> 0.
+        """
+        unit_prices = {}
+        for service_id in service_type_ids.unique():
+            service = ServiceTypeCatalogue.get(service_id)
+            unit_prices[service_id] = service.price_per_m2 if service else 0.0
+        return service_type_ids.map(unit_prices).astype(float)
 
-    def _recompute_reward(self, row):
+    def _rewards(self, df):
         """
         Tính reward dựa vào base_rate và price_adjustment nếu cần.
         Nếu DB đã có reward hợp lệ, có thể giữ; nhưng để nhất quán ta ưu tiên tính lại
@@ -141,44 +397,96 @@ class SmartPricingTrainer:
         - Khách hàng trung thành (score >= 3): Thưởng khi giảm giá, phạt khi tăng giá
         - Khách hàng mới (score < 3): Cho phép tăng giá nhẹ
         """
-        base_rate = self._compute_base_rate(row.get('service_type_id', 0), row.get('area_m2', 0))  # ✅ FIX
-        try:
-            delta = float(row.get('price_adjustment', 0.0))
-        except Exception:
-            delta = 0.0
+        base_rate = df['base_rate'].to_numpy()
+        delta = df['price_adjustment'].to_numpy()
+        loyalty_level = df['loyalty_level'].to_numpy()
         proposed_price = base_rate * (1 + delta)
-        accepted = int(row.get('accepted_status', 0)) if pd.notna(row.get('accepted_status', None)) else None
-        loyalty_level = self._customer_loyalty_level(row.get('customer_history_score', 0))
 
+        # Base reward từ profit
+        profit_reward = proposed_price - base_rate
 
-        if accepted is None:
-            # nếu không có accepted_status, fallback về cột reward nếu có
-            try:
-                return float(row.get('reward', 0.0))
-            except Exception:
-                return 0.0
-        else:
-            if accepted == 1:
-                # Base reward từ profit
-                profit_reward = proposed_price - base_rate
-                
-                # Loyalty adjustment: khách trung thành được ưu đãi
-                loyalty_adjustment = 0
-                if loyalty_level >= 2:  # Khách hàng trung thành
-                    if delta < 0:  # Giảm giá
-                        loyalty_adjustment = abs(delta) * base_rate * (1.5 + loyalty_level * 0.3)  # Càng VIP thưởng càng cao
-                    elif delta > 0:  # Tăng giá
-                        loyalty_adjustment = -delta * base_rate * (2.0 + loyalty_level * 0.5)  # Càng VIP phạt càng nặng
-                else:  # Khách hàng mới (score < 3)
-                    if delta > 0 and delta <= 0.1:  # Tăng giá nhẹ cho khách mới → OK
-                        loyalty_adjustment = delta * base_rate * 0.3
-                    elif delta > 0.1:  # Tăng giá quá mức → Phạt nhẹ
-                        loyalty_adjustment = -delta * base_rate * 0.5
-                
-                return profit_reward + loyalty_adjustment
-            else:
-                # Bị reject → penalty nặng
-                return -base_rate * 0.5
+        # Loyalty adjustment: khách trung thành được ưu đãi
+        loyal = loyalty_level >= 2
+        loyalty_adjustment = np.select(
+            [
+                loyal & (delta < 0),  # Giảm giá: càng VIP thưởng càng cao
+                loyal & (delta > 0),  # Tăng giá: càng VIP phạt càng nặng
+                ~loyal & (delta > 0) & (delta <= 0.1),  # Tăng giá nhẹ cho khách mới → OK
+                ~loyal & (delta > 0.1),  # Tăng giá quá mức → Phạt nhẹ
+            ],
+            [
+                np.abs(delta) * base_rate * (1.5 + loyalty_level * 0.3),
+                -delta * base_rate * (2.0 + loyalty_level * 0.5),
+                delta * base_rate * 0.3,
+                -delta * base_rate * 0.5,
+            ],
+            default=0,
+        )
+
+        accepted_status = df['accepted_status']
+        missing = accepted_status.isna().to_numpy()
+        accepted = accepted_status.where(~accepted_status.isna(), 0).astype(float).astype(int).to_numpy() == 1
+        # Bị reject → penalty nặng
+        rewards = np.where(accepted, profit_reward + loyalty_adjustment, -base_rate * 0.5)
+
+        # Nếu không có accepted_status, fallback về cột reward (giá trị không hợp lệ -> 0)
+        import pandas as pd
+
+        fallback = pd.to_numeric(df['reward'], errors='coerce')
+        fallback = fallback.where(fallback.notna() | df['reward'].isna(), 0.0).to_numpy(dtype=float)
+        return np.where(missing, fallback, rewards)
+
+    def encode_transitions(self, df):
+        """(state index, action index, reward) của từng dòng đã qua `prepare_training_data`."""
+        states = QAgent.encode_states(df['service_type_id'], df['hours_peak'], df['loyalty_level'], df['area_level'])
+        # map price_adjustment -> action index (closest, như min(range(...), key=...))
+        actions = np.argmin(
+            np.abs(np.array(self.ACTIONS)[None, :] - df['price_adjustment'].to_numpy(dtype=float)[:, None]),
+            axis=1,
+        )
+        # reward: dùng computed_reward đã tính lại
+        rewards = df['computed_reward'].to_numpy(dtype=float)
+        return states, actions, rewards
+
+    def load_agent(self):
+        """Q-agent hiện tại để học tiếp: file .npy, pickle cũ hoặc Q-table mới."""
+        if os.path.exists(self.MODEL_PATH):
+            return QAgent.load(self.MODEL_PATH, mmap=False)
+        if os.path.exists(self.LEGACY_MODEL_PATH):
+            return QAgent.from_pickle(self.LEGACY_MODEL_PATH, len(self.ACTIONS))
+        return QAgent(action_size=len(self.ACTIONS))
+
+    def prepare_training_data(self, df):
+        """
+        Chuẩn hoá dữ liệu và thêm các cột area_level, loyalty_level, base_rate, computed_reward
+        bằng phép toán trên cột (bảng giá ServiceType đọc từ ServiceTypeCatalogue).
+        """
+        # Clean / đảm bảo các cột quan trọng tồn tại
+        expected_cols = ['service_type_id', 'hours_peak', 'customer_history_score', 'area_m2', 'price_adjustment', 'reward', 'accepted_status']
+        for c in expected_cols:
+            if c not in df.columns:
+                df[c] = 0
+
+        # Chuẩn hoá kiểu dữ liệu cơ bản
+        df['service_type_id'] = df['service_type_id'].fillna(0).astype(int)
+        df['hours_peak'] = df['hours_peak'].fillna(0).astype(int)
+        df['customer_history_score'] = df['customer_history_score'].fillna(0).astype(int)
+        df['area_m2'] = df['area_m2'].fillna(0).astype(float)
+        df['price_adjustment'] = df['price_adjustment'].fillna(0).astype(float)
+        # reward và accepted_status giữ nguyên để tính lại nếu cần
+
+        # Tạo các cột phụ: area_level, loyalty_level, base_rate = unit_price_per_m2 * area_m2
+        df['area_level'] = self._area_levels(df['area_m2'])
+        df['loyalty_level'] = self._loyalty_levels(df['customer_history_score'])
+        # Dòng có state ngoài Q-table (vd. service_type_id mới) không được học vào state khác
+        valid = QAgent.valid_states(df['service_type_id'], df['hours_peak'], df['loyalty_level'], df['area_level'])
+        if not valid.all():
+            logger.warning(f"Skipping {int((~valid).sum())} rows whose state is outside {QAgent.STATE_SHAPE}")
+            df = df[valid].copy()
+        df['base_rate'] = self._unit_prices(df['service_type_id']) * df['area_m2']
+        # Tính lại reward để nhất quán (nếu DB có accepted_status, dùng nó)
+        df['computed_reward'] = self._rewards(df)
+        return df
 
     def _customer_loyalty_level(self, order_score):
         """
@@ -225,81 +533,66 @@ class SmartPricingTrainer:
             print(f"At least {self.MIN_SAMPLES} samples are required, but only {len(df)} are available. Not enough to train.")
             return
 
-        # 2b) Clean / đảm bảo các cột quan trọng tồn tại
-        expected_cols = ['service_type_id', 'hours_peak', 'customer_history_score', 'area_m2', 'price_adjustment', 'reward', 'accepted_status']
-        for c in expected_cols:
-            if c not in df.columns:
-                df[c] = 0
-
-        # Chuẩn hoá kiểu dữ liệu cơ bản
-        df['service_type_id'] = df['service_type_id'].fillna(0).astype(int)
-        df['hours_peak'] = df['hours_peak'].fillna(0).astype(int)
-        df['customer_history_score'] = df['customer_history_score'].fillna(0).astype(int)
-        df['area_m2'] = df['area_m2'].fillna(0).astype(float)
-        df['price_adjustment'] = df['price_adjustment'].fillna(0).astype(float)
-        # reward và accepted_status giữ nguyên để tính lại nếu cần
-
-        # 3) Tạo các cột phụ: area_level và base_rate, recomputed_reward
-        df['area_level'] = df['area_m2'].apply(self._area_level)
-        df['base_rate'] = df.apply(lambda r: self._compute_base_rate(r['service_type_id'], r['area_m2']), axis=1)
-        # Tính lại reward để nhất quán (nếu DB có accepted_status, dùng nó)
-        df['computed_reward'] = df.apply(lambda r: self._recompute_reward(r), axis=1)
+        # 3) Chuẩn hoá và tạo các cột phụ: area_level, loyalty_level, base_rate, computed_reward
+        df = self.prepare_training_data(df)
 
         # 4) Initialize agent
         agent = QAgent(action_size=len(self.ACTIONS))
+        loaded_stamp = model_file_stamp(self.MODEL_PATH)
 
         # Load old model nếu có để tiếp tục học (incremental)
-        if os.path.exists(self.MODEL_PATH):
-            try:
-                with open(self.MODEL_PATH, 'rb') as f:
-                    old_agent = pickle.load(f)
-                    if hasattr(old_agent, 'Q'):
-                        agent.Q = old_agent.Q
-                        print("Loaded old Q-table to continue learning")
-                    else:
-                        print("Old model doesn't contain Q attribute, training from scratch.")
-            except Exception as e:
-                print(f"Can't load old model: {e}. Training from scratch.")
+        try:
+            if os.path.exists(self.MODEL_PATH):
+                agent.Q = QAgent.load(self.MODEL_PATH, mmap=False).Q
+                print("Loaded old Q-table to continue learning")
+            elif os.path.exists(self.LEGACY_MODEL_PATH):
+                agent.Q = QAgent.from_pickle(self.LEGACY_MODEL_PATH, len(self.ACTIONS)).Q
+                print("Converted old pickled Q-table to continue learning")
+        except Exception as e:
+            print(f"Can't load old model: {e}. Training from scratch.")
 
         epochs = 50
         print(f"Starting training for {epochs} epochs...")
-        avg_rewards = []
 
-        # 5) Training loop: dùng sequence từ các bản ghi (lấy từng cặp (i, i+1) như bạn làm)
+        # 5) Mã hóa trước state, next_state, action và reward thành mảng
+        df = df.reset_index(drop=True)
+        states, actions, rewards = self.encode_transitions(df)
+        positions = df.index.to_series()
+        avg_rewards = self._train_epochs(agent, states, actions, rewards, positions, epochs)
+
+        # 6) Save model
+        os.makedirs(os.path.dirname(self.MODEL_PATH), exist_ok=True)
+        try:
+            with model_file_lock(self.MODEL_PATH):
+                if model_file_stamp(self.MODEL_PATH) != loaded_stamp:
+                    # Model đã được ghi trong lúc train (checkpoint của online learner, ...): train lại
+                    # trên Q-table mới nhất trong khóa thay vì ghi đè mất các cập nhật đó
+                    print("Model file changed during training, retraining on the latest Q-table")
+                    agent = self.load_agent()
+                    avg_rewards = self._train_epochs(agent, states, actions, rewards, positions, epochs)
+                agent.save(self.MODEL_PATH)
+            print(f"Model training completed and saved at {self.MODEL_PATH}")
+            print(f"Q-table size: {len(agent.learned_states())} states")
+        except Exception as e:
+            logger.exception("Failed to save model: %s", e)
+            print(f"Failed to save model: {e}")
+
+        # Vẽ đồ thị reward qua từng epoch ra file (không cần màn hình)
+        self.save_training_plot(avg_rewards)
+
+    def _train_epochs(self, agent, states, actions, rewards, positions, epochs):
+        """Training loop của `train_model`; trả về reward trung bình của từng epoch."""
+        from tqdm import tqdm
+
+        avg_rewards = []
+        # Training loop: dùng sequence từ các bản ghi (lấy từng cặp (i, i+1) theo thứ tự xáo trộn)
         for epoch in tqdm(range(epochs), desc="Training progress"):
-            df_shuffled = df.sample(frac=1, random_state=epoch).reset_index(drop=True)
-            epoch_rewards = []
-
-            for i in range(len(df_shuffled) - 1):
-                row = df_shuffled.iloc[i]
-                next_row = df_shuffled.iloc[i + 1]
-
-                # Build state và next_state gồm area_level
-                state = (
-                    int(row['service_type_id']),
-                    int(row['hours_peak']),
-                    self._customer_loyalty_level(row['customer_history_score']),
-                    int(row['area_level'])  
-                )
-
-                next_state = (
-                    int(next_row['service_type_id']),
-                    int(next_row['hours_peak']),
-                    self._customer_loyalty_level(next_row['customer_history_score']), 
-                    int(next_row['area_level'])
-                )
-
-                # map price_adjustment -> action index (closest)
-                delta = float(row['price_adjustment'])
-                action_idx = min(range(len(self.ACTIONS)),
-                                 key=lambda j: abs(self.ACTIONS[j] - delta))
-
-                # reward: dùng computed_reward đã tính lại
-                reward = float(row.get('computed_reward', 0.0))
-
-                # learn
-                agent.learn(state, action_idx, reward, next_state)
-                epoch_rewards.append(reward)
+            # Cùng hoán vị với df.sample(frac=1, random_state=epoch) trước đây
+            order = positions.sample(frac=1, random_state=epoch).to_numpy()
+            current, following = order[:-1], order[1:]
+
+            agent.learn_sequence(states[current], actions[current], rewards[current], states[following])
+            epoch_rewards = rewards[current]
 
             avg_r = np.mean(epoch_rewards)
             avg_rewards.append(avg_r)
@@ -308,57 +601,262 @@ class SmartPricingTrainer:
                 print(f" Epoch {epoch + 1}/{epochs} completed")
 
                 # In 3 Q-values cao nhất
-                top_states = sorted(agent.Q.items(), key=lambda kv: max(kv[1]), reverse=True)[:3]
+                top_states = sorted(agent.learned_states(), key=lambda kv: max(kv[1]), reverse=True)[:3]
                 print("🔹 Top learned states:")
                 for s, qvals in top_states:
                     print(f"   State {s}: Q = {[round(v, 2) for v in qvals]}")
+        return avg_rewards
 
-        # 6) Save model
-        os.makedirs(os.path.dirname(self.MODEL_PATH), exist_ok=True)
+    def save_training_plot(self, avg_rewards):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(figsize=(8, 4))
         try:
-            with open(self.MODEL_PATH, 'wb') as f:
-                pickle.dump(agent, f)
-            print(f"Model training completed and saved at {self.MODEL_PATH}")
-            print(f"Q-table size: {len(agent.Q)} states")
-        except Exception as e:
-            logger.exception("Failed to save model: %s", e)
-            print(f"Failed to save model: {e}")
+            ax.plot(avg_rewards, label="Average Reward per Epoch")
+            ax.set_xlabel("Epoch")
+            ax.set_ylabel("Avg Reward")
+            ax.set_title("Smart Pricing Training Progress")
+            ax.legend()
+            os.makedirs(os.path.dirname(self.PLOT_PATH), exist_ok=True)
+            fig.savefig(self.PLOT_PATH)
+            print(f"Training plot saved at {self.PLOT_PATH}")
+        finally:
+            plt.close(fig)
+
+
+class SmartPricingOnlineLearner:
+    """
+    Học online từ kết quả của các báo giá (chạy bằng command `smart_pricing_online_learner`).
+
+    - Chỉ một process ghi: learner đọc các bản ghi Smart_Pricing thay vì mỗi web worker tự có
+      một thread ghi đè MODEL_PATH của nhau.
+    - Chỉ học báo giá đã có kết quả (`decided_at`, ghi bằng `Smart_Pricing.record_outcome`) và chưa
+      được học (`learned_at` rỗng), theo thứ tự decided_at: mỗi báo giá đúng một cập nhật Bellman
+      dù bản ghi được lưu lại bao nhiêu lần.
+    - Các báo giá liên tiếp tạo cặp (state, next_state) giống vòng train (`QAgent.learn_sequence`).
+    - Checkpoint sau mỗi CHECKPOINT_SECONDS, dưới `model_file_lock`: nếu file model đã bị thay
+      (retrain/sweep) kể từ lần load, Q-table được load lại và các batch chưa checkpoint được học
+      lại trên đó trước khi ghi. Sau khi ghi model, các báo giá của checkpoint được đánh dấu learned_at.
+    """
+    BATCH_SIZE = 100
+    POLL_SECONDS = 5
+    CHECKPOINT_SECONDS = 60
+    FIELDS = ['service_type_id', 'hours_peak', 'customer_history_score', 'area_m2', 'price_adjustment', 'reward', 'accepted_status']
+
+    def __init__(self, trainer=None):
+        self.trainer = trainer or SmartPricingTrainer()
+        self.agent = None
+        self.file_stamp = None
+        self.previous = None  # (state, action, reward) của báo giá cuối cùng, chờ next_state
+        self.pending = []  # [(ids, batch)] đã học nhưng chưa checkpoint
+        self.last_checkpoint = time.monotonic()
+
+    @classmethod
+    def transition(cls, pricing):
+        """Giá trị cần để học từ một bản ghi Smart_Pricing (Decimal -> float)."""
+        values = {field: getattr(pricing, field) for field in cls.FIELDS}
+        for field in ('area_m2', 'price_adjustment', 'reward'):
+            if values[field] is not None:
+                values[field] = float(values[field])
+        return values
+
+    def run(self, once=False):
+        """Poll newly decided quotes, learn them in micro-batches and checkpoint periodically."""
+        from django.db import close_old_connections
+
+        while True:
+            batch = []
+            try:
+                ids, batch = self.next_batch()
+                if batch:
+                    self.learn(ids, batch)
+                if self.pending and (once or time.monotonic() - self.last_checkpoint >= self.CHECKPOINT_SECONDS):
+                    self.checkpoint()
+            except Exception:
+                # Batch lỗi chưa vào `pending` nên được đọc lại ở lần poll sau
+                logger.exception("Online smart pricing update failed for %s quotes", len(batch))
+            finally:
+                close_old_connections()
+            if len(batch) < self.BATCH_SIZE:
+                if once:
+                    return
+                time.sleep(self.POLL_SECONDS)
+
+    def next_batch(self):
+        """(ids, transitions) of the next BATCH_SIZE decided quotes not learned yet (bỏ qua các batch chờ checkpoint)."""
+        pending_ids = [pk for ids, _ in self.pending for pk in ids]
+        rows = list(
+            Smart_Pricing.objects.filter(decided_at__isnull=False, learned_at__isnull=True)
+            .exclude(id__in=pending_ids)
+            .order_by('decided_at', 'id')[:self.BATCH_SIZE]
+        )
+        return [row.id for row in rows], [self.transition(row) for row in rows]
 
-        # (Tùy chọn) Vẽ đồ thị reward qua từng epoch
-        plt.figure(figsize=(8, 4))
-        plt.plot(avg_rewards, label="Average Reward per Epoch")
-        plt.xlabel("Epoch")
-        plt.ylabel("Avg Reward")
-        plt.title("Smart Pricing Training Progress")
-        plt.legend()
-        plt.show()
+    def learn(self, ids, batch):
+        if self.agent is None or model_file_stamp(self.trainer.MODEL_PATH) != self.file_stamp:
+            # Lần đầu, hoặc model vừa được retrain: học tiếp trên model mới nhất
+            self._reload()
+        self.previous = self._learn(self.trainer, self.agent, batch, self.previous)
+        self.pending.append((ids, batch))
+
+    def checkpoint(self):
+        """Save the Q-table (reload and replay pending batches first if the model file changed), then mark the quotes learned."""
+        from django.utils import timezone
+
+        path = self.trainer.MODEL_PATH
+        with model_file_lock(path):
+            if model_file_stamp(path) != self.file_stamp:
+                self._reload()
+            self.agent.save(path)
+            self.file_stamp = model_file_stamp(path)
+            ids = [pk for ids, _ in self.pending for pk in ids]
+            # update() không đổi updated_at
+            Smart_Pricing.objects.filter(id__in=ids).update(learned_at=timezone.now())
+        logger.info("Checkpointed %s online quotes to %s", len(ids), path)
+        self.pending = []
+        self.last_checkpoint = time.monotonic()
+
+    def _reload(self):
+        # Stamp lấy trước khi load: file bị thay giữa hai bước thì lần kiểm tra sau sẽ load lại
+        self.file_stamp = model_file_stamp(self.trainer.MODEL_PATH)
+        self.agent = self.trainer.load_agent()
+        self.previous = None
+        for _, batch in self.pending:
+            self.previous = self._learn(self.trainer, self.agent, batch, self.previous)
+
+    @staticmethod
+    def _learn(trainer, agent, batch, previous):
+        import pandas as pd
+
+        df = trainer.prepare_training_data(pd.DataFrame(batch))
+        states, actions, rewards = trainer.encode_transitions(df)
+        if previous is not None:
+            states = np.concatenate(([previous[0]], states))
+            actions = np.concatenate(([previous[1]], actions))
+            rewards = np.concatenate(([previous[2]], rewards))
+        if len(states) == 0:
+            return previous
+        if len(states) > 1:
+            agent.learn_sequence(states[:-1], actions[:-1], rewards[:-1], states[1:])
+        return states[-1], actions[-1], rewards[-1]
 
 
 class SmartPricingPredictor:
-    """Service để dự đoán giá tối ưu từ trained Q-agent."""
+    """
+    Service để dự đoán giá tối ưu từ trained Q-agent.
+
+    Dùng `SmartPricingPredictor.instance()`: một predictor dùng chung cho cả process, load model
+    lần đầu khi được gọi. Khi file model thay đổi (mtime/kích thước, xác nhận bằng checksum),
+    model mới được load ở thread nền rồi thay thế bằng một phép gán duy nhất, nên các request
+    đang chạy luôn dùng trọn vẹn model cũ hoặc model mới.
+    """
     
-    MODEL_PATH = "../ml_models/q_agent_pricing.pkl"
+    MODEL_PATH = "../ml_models/q_agent_pricing.npy"
+    LEGACY_MODEL_PATH = "../ml_models/q_agent_pricing.pkl"
     ACTIONS = [-0.2, -0.1, 0.0, 0.1, 0.2]
     UNIT_PRICE_REGULAR = 40000
     UNIT_PRICE_DEEP = 59000
-    
+    RELOAD_CHECK_SECONDS = 5  # khoảng thời gian tối thiểu giữa hai lần stat file model
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Predictor dùng chung của process (khởi tạo lười)."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
     def __init__(self):
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._file_stamp = None  # (mtime_ns, size) của file đã load
+        self._checksum = None
+        self._checked_at = time.monotonic()
         self.agent = self._load_model()
     
+    def _stamp(self):
+        try:
+            stat = os.stat(self.MODEL_PATH)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _convert_legacy_model(self):
+        """Chuyển model pickle cũ sang file .npy (một lần) nếu chưa có file .npy."""
+        if not os.path.exists(self.LEGACY_MODEL_PATH):
+            return
+        try:
+            with model_file_lock(self.MODEL_PATH):
+                # Process khác có thể đã chuyển trong lúc chờ lock
+                if os.path.exists(self.MODEL_PATH):
+                    return
+                QAgent.from_pickle(self.LEGACY_MODEL_PATH, len(self.ACTIONS)).save(self.MODEL_PATH)
+            logger.info(f"Converted legacy model {self.LEGACY_MODEL_PATH} to {self.MODEL_PATH}")
+        except Exception as e:
+            logger.exception(f"❌ Failed to convert legacy model: {e}")
+
     def _load_model(self):
-        """Load trained Q-agent."""
-        if not os.path.exists(self.MODEL_PATH):
+        """Load trained Q-agent (model pickle cũ được chuyển sang .npy ở lần load đầu)."""
+        stamp = self._stamp()
+        if stamp is None:
+            self._convert_legacy_model()
+            stamp = self._stamp()
+        if stamp is None:
             logger.warning(f"Model not found at {self.MODEL_PATH}")
             return None
         
         try:
             with open(self.MODEL_PATH, 'rb') as f:
-                agent = pickle.load(f)
+                checksum = hashlib.sha256(f.read()).hexdigest()
+            agent = QAgent.load(self.MODEL_PATH)
+            self._file_stamp = stamp
+            self._checksum = checksum
             logger.info("✅ Loaded trained Q-agent successfully")
             return agent
         except Exception as e:
             logger.exception(f"❌ Failed to load model: {e}")
             return None
+
+    def _reload_if_changed(self):
+        """Start a background reload when the model file has changed (kiểm tra tối đa mỗi RELOAD_CHECK_SECONDS)."""
+        now = time.monotonic()
+        if now - self._checked_at < self.RELOAD_CHECK_SECONDS:
+            return
+        self._checked_at = now
+
+        stamp = self._stamp()
+        if stamp is None or stamp == self._file_stamp:
+            return
+        with self._reload_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="smart-pricing-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            stamp = self._stamp()
+            with open(self.MODEL_PATH, 'rb') as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+            if checksum != self._checksum:
+                agent = QAgent.load(self.MODEL_PATH)
+                self._checksum = checksum
+                # Thay model bằng một phép gán: request đang chạy vẫn giữ tham chiếu tới model cũ
+                self.agent = agent
+                logger.info("✅ Reloaded Q-agent from %s", self.MODEL_PATH)
+            self._file_stamp = stamp
+        except Exception as e:
+            # Giữ model hiện tại, thử lại ở lần kiểm tra sau
+            logger.exception(f"❌ Failed to reload model: {e}")
+        finally:
+            with self._reload_lock:
+                self._reloading = False
     
     def _area_level(self, area):
         """Phân loại diện tích."""
@@ -381,7 +879,7 @@ class SmartPricingPredictor:
         except Exception:
             area = 0.0
         
-        service = ServiceType.objects.filter(id=service_id).first()
+        service = ServiceTypeCatalogue.get(service_id)
         unit = service.price_per_m2 if service else 0.0
         return area * unit
     
@@ -431,23 +929,28 @@ class SmartPricingPredictor:
             }
         """
         try:
-            if self.agent is None:
+            self._reload_if_changed()
+            # Giữ một tham chiếu cho cả lần dự đoán, kể cả khi model được thay giữa chừng
+            agent = self.agent
+
+            if agent is None:
                 # Fallback: trả về giá cơ bản
                 base_rate = self._compute_base_rate(service_id, area_m2)
+                customer_obj = Customer.objects.filter(id=customer_id).first() if customer_id else None
                 return {
                     'base_rate': float(base_rate),
                     'proposed_price': float(base_rate),
                     'price_adjustment': 0.0,
                     'confidence': 'low',
                     'message': 'Model chưa được train',
-                    'loyalty_level': loyalty_level
+                    'loyalty_level': self._customer_loyalty_level(customer_obj.history_order_score if customer_obj else 0)
                 }
             
             # Tạo state
             area_level = self._area_level(area_m2)
             
             # Get service type
-            service = ServiceType.objects.filter(id=service_id).first()
+            service = ServiceTypeCatalogue.get(service_id)
             service_score = 1 if (service and service.name == "Deep Clean") else 0
             
             customer_obj = Customer.objects.filter(id=customer_id).first() if customer_id else None
@@ -468,8 +971,8 @@ class SmartPricingPredictor:
             
             
             # Chọn action tốt nhất (greedy, không có epsilon)
-            if state in self.agent.Q:
-                q_values = self.agent.Q[state]
+            if agent.knows(state):
+                q_values = agent.Q[agent.encode_state(state)]
                 best_action_idx = int(np.argmax(q_values))
                 price_adjustment = self.ACTIONS[best_action_idx]
                 confidence = 'high'
@@ -493,3 +996,93 @@ class SmartPricingPredictor:
         except Exception as e:
             print(f"Error in prediction: {e}")
             raise e
+
+    def predict_batch(self, quotes):
+        """
+        Dự đoán giá cho nhiều báo giá cùng lúc.
+
+        ServiceType đọc từ ServiceTypeCatalogue, Customer của cả lô load bằng một query; state được mã hóa
+        và tra Q-table bằng phép toán trên mảng. Mỗi kết quả giống `predict_optimal_price`.
+
+        Args:
+            quotes: [{'service_id', 'area_m2', 'hours_peak', 'customer_id'}]
+
+        Returns:
+            list[dict]: theo đúng thứ tự của quotes
+        """
+        if not quotes:
+            return []
+        self._reload_if_changed()
+        agent = self.agent
+
+        services = [ServiceTypeCatalogue.get(quote.get('service_id')) for quote in quotes]
+        customers = self._lookup(Customer, [quote.get('customer_id') for quote in quotes])
+
+        unit_prices = np.array([
+            service.price_per_m2 if service else 0.0 for service in services
+        ], dtype=float)
+        service_scores = np.array([
+            1 if (service and service.name == "Deep Clean") else 0 for service in services
+        ])
+        loyalty_levels = np.array([
+            self._customer_loyalty_level(customer.history_order_score if customer else 0)
+            for customer in customers
+        ])
+
+        areas = np.array([self._as_float(quote.get('area_m2')) for quote in quotes])
+        valid_area = ~np.isnan(areas)
+        base_rates = np.where(valid_area, areas, 0.0) * unit_prices
+        # Diện tích không hợp lệ -> nhóm trung bình
+        area_levels = np.where(valid_area, np.digitize(np.nan_to_num(areas), [40, 80]), 1)
+
+        if agent is None:
+            adjustments = np.zeros(len(quotes))
+            confidences = ['low'] * len(quotes)
+            message = 'Model chưa được train'
+        else:
+            hours_peak = np.array([int(quote.get('hours_peak') or 0) for quote in quotes])
+            # State ngoài Q-table -> dòng NaN, xử lý như state chưa học
+            valid = QAgent.valid_states(service_scores, hours_peak, loyalty_levels, area_levels)
+            rows = np.full((len(quotes), agent.action_size), np.nan)
+            rows[valid] = agent.Q[QAgent.encode_states(
+                service_scores[valid], hours_peak[valid], loyalty_levels[valid], area_levels[valid]
+            )]
+            known = ~np.isnan(rows[:, 0])
+            best_actions = np.argmax(np.nan_to_num(rows, nan=0.0), axis=1)
+            # State chưa học -> dùng action trung tính
+            adjustments = np.where(known, np.array(self.ACTIONS)[best_actions], 0.0)
+            confidences = np.where(known, 'high', 'medium').tolist()
+            message = 'Giá được đề xuất bởi AI'
+
+        proposed_prices = base_rates * (1 + adjustments)
+        return [
+            {
+                'base_rate': float(base_rates[i]),
+                'proposed_price': float(proposed_prices[i]),
+                'price_adjustment': float(adjustments[i]),
+                'confidence': confidences[i],
+                'message': message,
+                'loyalty_level': int(loyalty_levels[i]),
+            }
+            for i in range(len(quotes))
+        ]
+
+    @staticmethod
+    def _as_float(value):
+        try:
+            return float(value)
+        except Exception:
+            return np.nan
+
+    @staticmethod
+    def _lookup(model, ids):
+        """Objects for each id (None nếu không có hoặc id không hợp lệ), in one query."""
+        id_field = model._meta.pk
+        keys = []
+        for value in ids:
+            try:
+                keys.append(id_field.to_python(value) if value else None)
+            except Exception:
+                keys.append(None)
+        objects = model.objects.in_bulk({key for key in keys if key is not None})
+        return [objects.get(key) if key is not None else None for key in keys]
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from businesses.services.recommendation_cache import RecommendationCache
+
+from .models import ServiceType
+from .services.service_type_catalogue import ServiceTypeCatalogue
+
+
+@receiver(post_save, sender=ServiceType)
+@receiver(post_delete, sender=ServiceType)
+def invalidate_service_type_catalogue(sender, instance, **kwargs):
+    transaction.on_commit(ServiceTypeCatalogue.invalidate)
+    # Danh sách gợi ý đã cache chứa dữ liệu suy ra từ ServiceType (kỹ năng yêu cầu, ...)
+    transaction.on_commit(RecommendationCache.invalidate)
+
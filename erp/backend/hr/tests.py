@@ -0,0 +1,84 @@
+import os
+import pickle
+import random
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from hr.services.smart_pricing_service import QAgent
+
+
+class LegacyQAgent:
+    """QAgent trước khi chuyển sang Q-table NumPy (Q là dict state -> list), giữ nguyên để so sánh."""
+    def __init__(self, action_size, alpha=0.1, gamma=0.9, epsilon=0.2):
+        self.Q = {}
+        self.action_size = action_size
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+
+    def get_Q(self, state):
+        if state not in self.Q:
+            self.Q[state] = [0.0] * self.action_size
+        return self.Q[state]
+
+    def learn(self, state, action, reward, next_state):
+        current_q = self.get_Q(state)[action]
+        next_max = max(self.get_Q(next_state))
+        new_q = current_q + self.alpha * (reward + self.gamma * next_max - current_q)
+        self.Q[state][action] = new_q
+
+
+class QAgentEquivalenceTests(SimpleTestCase):
+    """Q-table dày phải cho cùng Q-values với agent dict cũ trên cùng các bước chuyển."""
+
+    ACTION_SIZE = 5
+
+    @classmethod
+    def transitions(cls, count, seed):
+        rng = random.Random(seed)
+        states = [tuple(rng.randrange(size) for size in QAgent.STATE_SHAPE) for _ in range(count + 1)]
+        return [
+            (states[i], rng.randrange(cls.ACTION_SIZE), rng.uniform(-50000, 50000), states[i + 1])
+            for i in range(count)
+        ]
+
+    def assertSameQ(self, legacy, agent):
+        self.assertEqual(len(agent.learned_states()), len(legacy.Q))
+        for state, q_values in legacy.Q.items():
+            np.testing.assert_allclose(agent.Q[QAgent.encode_state(state)], q_values, rtol=0, atol=1e-9)
+
+    def test_learn_sequence_matches_legacy_learn(self):
+        legacy = LegacyQAgent(self.ACTION_SIZE)
+        agent = QAgent(self.ACTION_SIZE)
+        transitions = self.transitions(500, seed=1)
+        for transition in transitions:
+            legacy.learn(*transition)
+
+        states, actions, rewards, next_states = zip(*transitions)
+        agent.learn_sequence(
+            QAgent.encode_states(*zip(*states)), np.array(actions),
+            np.array(rewards), QAgent.encode_states(*zip(*next_states)),
+        )
+        self.assertSameQ(legacy, agent)
+
+    def test_from_pickle_then_learning_matches_legacy(self):
+        legacy = LegacyQAgent(self.ACTION_SIZE, alpha=0.2, gamma=0.8)
+        for transition in self.transitions(300, seed=2):
+            legacy.learn(*transition)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "q_agent_pricing.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(legacy, f)
+            agent = QAgent.from_pickle(path, self.ACTION_SIZE)
+
+        self.assertEqual((agent.alpha, agent.gamma), (0.2, 0.8))
+        self.assertSameQ(legacy, agent)
+
+        # Học tiếp trên model đã chuyển đổi cũng cho cùng kết quả
+        for state, action, reward, next_state in self.transitions(300, seed=3):
+            legacy.learn(state, action, reward, next_state)
+            agent.learn(state, action, reward, next_state)
+        self.assertSameQ(legacy, agent)
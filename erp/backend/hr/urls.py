@@ -15,7 +15,7 @@ from .views import (
     SkillViewSet,
 )
 
-from hr.views.smartpricing import SmartPricingView
+from hr.views.smartpricing import SmartPricingView, SmartPricingBatchView
 from .views.order import OrderViewSet, AssignmentViewSet, CustomerViewSet, ServiceTypeViewSet,AssignmentViewSet
 
 app_name = "hr"
@@ -70,4 +70,5 @@ urlpatterns = [
     path('api/v1/customer/favorites/<uuid:pk>', FavoriteViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='customer-favorite-detail'),
     
     path('api/v1/smart-pricing/predict/', SmartPricingView.as_view(), name='smart-pricing-predict'),
+    path('api/v1/smart-pricing/predict-batch/', SmartPricingBatchView.as_view(), name='smart-pricing-predict-batch'),
 ]
\ No newline at end of file
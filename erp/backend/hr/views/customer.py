@@ -20,6 +20,7 @@ from rest_framework import status, permissions
 from hr.models.order import Order
 from hr.serializers.order import OrderSerializer
 from django.contrib.auth import get_user_model
+from oauth.principal import get_principal
 
 User = get_user_model()
 
@@ -38,15 +39,9 @@ class CustomerInfoAPIView(APIView):
     def get_customer(self, request):
         """Helper method to get customer from request"""
         jwt_user = request.auth.user if hasattr(request, 'auth') and request.auth else request.user
-        customer = None
-        
-        # Thử tìm customer bằng user relationship trước
-        if hasattr(jwt_user, 'email') and jwt_user.email:
-            try:
-                real_user = User.objects.get(email=jwt_user.email)
-                customer = Customer.objects.get(user=real_user)
-            except (User.DoesNotExist, Customer.DoesNotExist):
-                pass
+        # User/Customer thật đã được resolve một lần cho cả request
+        principal = get_principal(request)
+        customer = principal.customer
         
         # Nếu chưa tìm thấy, thử tìm bằng email
         if not customer and hasattr(jwt_user, 'email') and jwt_user.email:
@@ -54,14 +49,11 @@ class CustomerInfoAPIView(APIView):
                 customer = Customer.objects.get(email=jwt_user.email)
                 
                 # Link customer với user nếu chưa có
-                if not customer.user:
-                    try:
-                        real_user = User.objects.get(email=jwt_user.email)
-                        customer.user = real_user
-                        customer.save()
-                    except User.DoesNotExist:
-                        pass
-                        
+                if not customer.user and principal.user is not None:
+                    customer.user = principal.user
+                    customer.save()
+                    principal.customer = customer
+
             except Customer.DoesNotExist:
                 pass
         
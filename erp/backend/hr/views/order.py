@@ -12,6 +12,8 @@ from common.constants.http import Http
 from django.db.models import Q
 from hr.permissions import IsAdmin, IsEmployee, IsCustomer
 from businesses.models.employee import EmployeeWorkingStatus
+from businesses.services.recommendation_cache import RecommendationCache
+from oauth.principal import get_principal
 from rest_framework import status
 from decimal import Decimal
 import time
@@ -55,20 +57,10 @@ class OrderViewSet(BaseViewSet):
 
     def get_serializer_class(self):
         """Trả về serializer phù hợp dựa trên role của user"""
-        user = self.request.user
-        
-        # Nếu là JWTUser, lấy User thật từ database
-        if hasattr(user, 'id'):
-            from oauth.models import User
-            try:
-                real_user = User.objects.get(id=user.id)
-                
-                # Check if user is employee
-                if hasattr(real_user, 'employees') and real_user.employees.exists():
-                    if self.action in ['update', 'partial_update']:
-                        return OrderEmployeeSerializer
-            except User.DoesNotExist:
-                pass
+        # Check if user is employee
+        if get_principal(self.request).is_employee:
+            if self.action in ['update', 'partial_update']:
+                return OrderEmployeeSerializer
         
         return OrderSerializer
 
@@ -85,15 +77,10 @@ class OrderViewSet(BaseViewSet):
         if user.is_staff:
             return queryset
         
-        # Nếu là JWTUser, lấy User thật từ database
-        if hasattr(user, 'id'):
-            from oauth.models import User
-            try:
-                real_user = User.objects.get(id=user.id)
-                if hasattr(real_user, 'employees') and real_user.employees.exists():
-                    return queryset.filter(assignment__employee__user=real_user)
-            except User.DoesNotExist:
-                pass
+        # User thật (từ JWTUser) được resolve một lần cho cả request
+        principal = get_principal(self.request)
+        if principal.is_employee:
+            return queryset.filter(assignment__employee__user=principal.user)
         
         return queryset.none()
 
@@ -102,20 +89,13 @@ class OrderViewSet(BaseViewSet):
         if user.is_staff:
             return [permissions.IsAdminUser()]
         
-        # Nếu là JWTUser, lấy User thật từ database
-        if hasattr(user, 'id'):
-            from oauth.models import User
-            try:
-                real_user = User.objects.get(id=user.id)
-                if hasattr(real_user, 'employees') and real_user.employees.exists():
-                    if self.action in ['list', 'retrieve', 'assignments']:
-                        return [permissions.IsAuthenticated(), IsEmployee()]
-                    elif self.action in ['update', 'partial_update']:
-                        # Cho phép employee update (chỉ status thông qua OrderEmployeeSerializer)
-                        return [permissions.IsAuthenticated(), IsEmployee()]
-                    return [permissions.IsAdminUser()]
-            except User.DoesNotExist:
-                pass
+        if get_principal(self.request).is_employee:
+            if self.action in ['list', 'retrieve', 'assignments']:
+                return [permissions.IsAuthenticated(), IsEmployee()]
+            elif self.action in ['update', 'partial_update']:
+                # Cho phép employee update (chỉ status thông qua OrderEmployeeSerializer)
+                return [permissions.IsAuthenticated(), IsEmployee()]
+            return [permissions.IsAdminUser()]
         
         return super().get_permissions()
 
@@ -385,6 +365,9 @@ class OrderViewSet(BaseViewSet):
         order.status = new_status
         order.save()
         print(f"✅ Order {pk} status updated to {order.status}")
+
+        # Đơn vừa chuyển sang trạng thái có thể giao việc: tính trước danh sách đề xuất
+        RecommendationCache.schedule(order)
         
         serializer = self.get_serializer(order)
         return Response(serializer.data)
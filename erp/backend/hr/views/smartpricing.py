@@ -39,7 +39,7 @@ class SmartPricingView(APIView):
                 )
             
             # Predict
-            predictor = SmartPricingPredictor()
+            predictor = SmartPricingPredictor.instance()
             result = predictor.predict_optimal_price(
                 service_id=service_id,
                 area_m2=area_m2,
@@ -58,4 +58,49 @@ class SmartPricingView(APIView):
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class SmartPricingBatchView(APIView):
+    """
+    API để dự đoán giá cho nhiều báo giá trong một request.
+    
+    POST /api/v1/smart-pricing/predict-batch/
+    Body: {
+        "quotes": [
+            {"service_id": "...", "area_m2": 50, "hours_peak": false, "customer_id": "..."},
+            ...
+        ]
+    }
+    """
+    permission_classes = []
+    MAX_QUOTES = 200
+    
+    def post(self, request):
+        quotes = request.data.get('quotes')
+        if not isinstance(quotes, list) or not quotes:
+            return Response(
+                {'error': 'quotes phải là danh sách không rỗng'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(quotes) > self.MAX_QUOTES:
+            return Response(
+                {'error': f'Tối đa {self.MAX_QUOTES} báo giá mỗi request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        for index, quote in enumerate(quotes):
+            if not isinstance(quote, dict) or quote.get('service_id') is None or quote.get('area_m2') is None:
+                return Response(
+                    {'error': f'quotes[{index}]: service_id và area_m2 là bắt buộc'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            results = SmartPricingPredictor.instance().predict_batch(quotes)
+            return Response({'results': results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.exception("Error predicting batch prices")
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedClaimsCache:
+    """
+    Process-wide LRU cache of verified JWT claims, keyed by sha256 of the token.
+
+    - Token đã verify chữ ký RSA thì các request sau chỉ là một lần đọc dict cho tới `exp`.
+    - Giới hạn OAUTH_CLAIMS_CACHE_SIZE token, token ít dùng nhất bị loại trước.
+    - Cache chỉ thay cho bước verify chữ ký, không thay cho kiểm tra thu hồi: validator vẫn tra row
+      AccessToken (bị xóa khi logout ở bất kỳ worker nào) trước khi chấp nhận claims.
+      `revoke` bỏ token khỏi cache của process đã nhận request thu hồi.
+    - Đếm hit/miss, ghi log mỗi LOG_EVERY lượt tra cứu.
+    """
+    LOG_EVERY = 10000
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # token hash -> (exp, claims)
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def get(cls, token):
+        """Cached claims of a token, or None if missing or expired."""
+        key = cls.key(token)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del cls._entries[key]
+                entry = None
+            if entry is None:
+                cls._misses += 1
+            else:
+                cls._entries.move_to_end(key)
+                cls._hits += 1
+            lookups = cls._hits + cls._misses
+        if lookups % cls.LOG_EVERY == 0:
+            logger.info("JWT claims cache: %s", cls.stats())
+        return None if entry is None else entry[1]
+
+    @classmethod
+    def put(cls, token, claims):
+        try:
+            exp = float(claims["exp"])
+        except (KeyError, TypeError, ValueError):
+            return
+        max_size = getattr(settings, 'OAUTH_CLAIMS_CACHE_SIZE', 10000)
+        if max_size <= 0 or exp <= time.time():
+            return
+        key = cls.key(token)
+        with cls._lock:
+            cls._entries[key] = (exp, claims)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > max_size:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def revoke(cls, token):
+        """Drop a revoked token so its claims are never served from this process's cache again."""
+        if not token:
+            return
+        with cls._lock:
+            cls._entries.pop(cls.key(token), None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            lookups = cls._hits + cls._misses
+            return {
+                "size": len(cls._entries),
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "hit_rate": cls._hits / lookups if lookups else 0.0,
+            }
@@ -1,2 +1,5 @@
 from .user_manager import UserManager
-from .api_key_manager import ApiKeyManager
\ No newline at end of file
+from .api_key_manager import ApiKeyManager
+from .access_token_manager import AccessTokenQuerySet
+
+__all__ = ["UserManager", "ApiKeyManager", "AccessTokenQuerySet"]
@@ -0,0 +1,14 @@
+import hashlib
+
+from django.db import models
+
+
+class AccessTokenQuerySet(models.QuerySet):
+    @staticmethod
+    def checksum(token):
+        """sha256 của token (JWT dài vài KB) dùng làm khóa tra cứu có index."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def for_token(self, token):
+        """Access tokens matching the token string, looked up through the indexed checksum."""
+        return self.filter(token_checksum=self.checksum(token), token=token)
@@ -0,0 +1,32 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_token_checksum(apps, schema_editor):
+    AccessToken = apps.get_model('oauth', 'AccessToken')
+    batch = []
+    for access_token in AccessToken.objects.only('id', 'token').iterator(chunk_size=1000):
+        access_token.token_checksum = hashlib.sha256((access_token.token or '').encode()).hexdigest()
+        batch.append(access_token)
+        if len(batch) >= 1000:
+            AccessToken.objects.bulk_update(batch, ['token_checksum'])
+            batch = []
+    if batch:
+        AccessToken.objects.bulk_update(batch, ['token_checksum'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth', '0003_user_is_guest_alter_user_is_staff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesstoken',
+            name='token_checksum',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_token_checksum, migrations.RunPython.noop),
+    ]
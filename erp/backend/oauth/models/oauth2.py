@@ -3,6 +3,8 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import pytz
 
+from ..managers import AccessTokenQuerySet
+
 utc=pytz.UTC
 
 # Create your models here.
@@ -46,6 +48,8 @@ class AccessToken(AbstractAccessToken):
         related_name="refreshed_access_token",
     )
     token = models.TextField(blank=True)
+    # TEXT không index được, nên tra cứu token qua sha256 có index (xem AccessTokenQuerySet.for_token)
+    token_checksum = models.CharField(max_length=64, blank=True, default="", db_index=True, editable=False)
     application = models.ForeignKey(
         Application,
         on_delete=models.CASCADE,
@@ -60,6 +64,15 @@ class AccessToken(AbstractAccessToken):
         related_name="access_token",
     )
 
+    objects = AccessTokenQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.token_checksum = AccessTokenQuerySet.checksum(self.token or "")
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "token" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "token_checksum"}
+        super().save(*args, **kwargs)
+
     def is_expired(self):
         """
         Check token expiration with timezone awareness
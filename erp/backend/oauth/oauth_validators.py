@@ -1,20 +1,42 @@
 import json
+from contextvars import ContextVar
 from urllib import request
 from jwcrypto import jwt
 from jwcrypto.common import JWException
 from jwcrypto.jwt import JWTExpired
 from oauth2_provider.oauth2_validators import OAuth2Validator
+from .claims_cache import VerifiedClaimsCache
 from .tokens import JWTAccessToken
 from django.contrib.auth import get_user_model
 
 from oauth2_provider.models import (
     get_access_token_model,
     get_id_token_model,
+    get_refresh_token_model,
 )
 IDToken = get_id_token_model()
 AccessToken = get_access_token_model()
+RefreshToken = get_refresh_token_model()
 User = get_user_model()
 
+# AccessToken vừa được tạo trong request hiện tại (xem `issued_access_token`)
+_issued_access_token = ContextVar("issued_access_token", default=None)
+
+
+def issued_access_token(token):
+    """
+    AccessToken row of a token just returned by `create_token_response`.
+
+    Dùng instance mà validator vừa tạo thay vì đọc lại DB; nếu oauthlib dùng lại token cũ
+    (refresh trong grace period) thì tra theo checksum có index.
+    """
+    access_token = _issued_access_token.get()
+    _issued_access_token.set(None)
+    if access_token is not None and access_token.token == token:
+        return access_token
+    return AccessToken.objects.for_token(token).first()
+
+
 class CustomOAuth2Validator(OAuth2Validator):
     def validate_bearer_token(self, token, scopes, request):
         if self.validate_bearer_jwt_token(token, scopes, request):
@@ -69,19 +91,53 @@ class CustomOAuth2Validator(OAuth2Validator):
             "email": request.user.email,
         }
     
+    def _create_access_token(self, expires, request, token, source_refresh_token=None):
+        access_token = super()._create_access_token(expires, request, token, source_refresh_token=source_refresh_token)
+        _issued_access_token.set(access_token)
+        return access_token
+
+    def _load_access_token(self, token):
+        return AccessToken.objects.select_related("application", "user").for_token(token).first()
+
+    def revoke_token(self, token, token_type_hint, request, *args, **kwargs):
+        """
+        Revoke an access or refresh token (giống OAuth2Validator.revoke_token, nhưng access token
+        được tra theo checksum có index thay vì cột token TEXT).
+        """
+        access_tokens = AccessToken.objects.for_token(token)
+        refresh_tokens = RefreshToken.objects.filter(token=token)
+        if token_type_hint == "refresh_token":
+            candidates = [refresh_tokens, access_tokens]
+        else:
+            candidates = [access_tokens, refresh_tokens]
+        for queryset in candidates:
+            found = list(queryset)
+            if found:
+                for instance in found:
+                    instance.revoke()
+                break
+        VerifiedClaimsCache.revoke(token)
+
     # If we use jwt token for accesstoken
     def validate_bearer_jwt_token(self, token, scopes, request):
-        key = self._get_key_for_token(token)
-        if not key:
-            return False
-        
         try:
-            jwt_token = jwt.JWT(key=key, jwt=token)
-            claims = json.loads(jwt_token.claims)
+            # Token đã verify chữ ký thì lấy claims từ cache, bỏ qua bước verify RSA
+            claims = VerifiedClaimsCache.get(token)
+            if claims is None:
+                key = self._get_key_for_token(token)
+                if not key:
+                    return False
+                jwt_token = jwt.JWT(key=key, jwt=token)
+                claims = json.loads(jwt_token.claims)
+                VerifiedClaimsCache.put(token, claims)
             jti = claims.get("jti")
             if jti is None:
                 access_token = JWTAccessToken(claims)
                 if access_token.is_valid(scopes):
+                    # Logout (ở bất kỳ worker nào) xóa row AccessToken: tra theo checksum có index
+                    if not AccessToken.objects.for_token(token).exists():
+                        VerifiedClaimsCache.revoke(token)
+                        return False
                     request.client = access_token.application
                     request.user = access_token.user
                     request.scopes = list(access_token.scopes)
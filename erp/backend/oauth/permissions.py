@@ -20,6 +20,9 @@ class TokenHasActionScope(TokenMatchesOASRequirements):
     TODO: DRY: subclass TokenHasScope and iterate over values of required_scope?
     """
 
+    # view class -> (required_alternate_scopes gốc, {action: (frozenset, ...)})
+    _compiled = {}
+
     def has_permission(self, request, view):
         token = request.auth
 
@@ -27,22 +30,18 @@ class TokenHasActionScope(TokenMatchesOASRequirements):
             return False
 
         if hasattr(token, "scope"):  # OAuth 2
-            required_alternate_scopes = self.get_required_alternate_scopes(request, view)
+            alternatives = self.get_compiled_alternate_scopes(request, view)
 
             a = view.action.lower() if view.action is not None else None
 
-            if a in required_alternate_scopes:
-                log.debug(
-                    "Required scopes alternatives to access resource: {0}".format(
-                        required_alternate_scopes[a]
-                    )
-                )
-                for alt in required_alternate_scopes[a]:
-                    if token.is_valid(alt):
-                        return True
-                return False
+            if a in alternatives:
+                log.debug("Required scopes alternatives to access resource: %s", alternatives[a])
+                if token.is_expired():
+                    return False
+                token_scopes = self.get_token_scopes(token)
+                return any(alt <= token_scopes for alt in alternatives[a])
             else:
-                log.warning("no scope alternates defined for method {0}".format(a))
+                log.warning("no scope alternates defined for method %s", a)
                 return False
 
         assert False, (
@@ -51,6 +50,33 @@ class TokenHasActionScope(TokenMatchesOASRequirements):
             "class to be used."
         )
 
+    def get_compiled_alternate_scopes(self, request, view):
+        """
+        `required_alternate_scopes` of the view compiled once into frozensets, per view class.
+
+        Biên dịch lại nếu view thay đổi dict required_alternate_scopes.
+        """
+        required_alternate_scopes = self.get_required_alternate_scopes(request, view)
+        cached = self._compiled.get(type(view))
+        if cached is None or cached[0] is not required_alternate_scopes:
+            cached = (
+                required_alternate_scopes,
+                {
+                    action: tuple(frozenset(alt) for alt in alts)
+                    for action, alts in required_alternate_scopes.items()
+                },
+            )
+            self._compiled[type(view)] = cached
+        return cached[1]
+
+    @staticmethod
+    def get_token_scopes(token):
+        """Scope set of the token (JWTAccessToken tách sẵn một lần; AccessToken từ DB thì tách tại đây)."""
+        token_scopes = getattr(token, "scope_set", None)
+        if token_scopes is None:
+            token_scopes = frozenset(token.scope.split()) if token.scope else frozenset()
+        return token_scopes
+
 class IsAdministrator(TokenMatchesOASRequirements):
     """
     Allows access only to administrator.
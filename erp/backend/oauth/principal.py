@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+
+User = get_user_model()
+
+
+class Principal:
+    """
+    Identity of the authenticated caller: User thật trong DB, Employee và Customer gắn với User đó.
+
+    request.user của API là JWTUser dựng từ claims (không phải model), nên các view cần
+    User/Employee/Customer thật dùng `get_principal(request)` thay vì tự query.
+    """
+
+    def __init__(self, user=None, employee=None, customer=None):
+        self.user = user
+        self.employee = employee
+        self.customer = customer
+
+    @property
+    def is_authenticated(self):
+        return self.user is not None
+
+    @property
+    def is_staff(self):
+        return bool(self.user and self.user.is_staff)
+
+    @property
+    def is_superuser(self):
+        return bool(self.user and self.user.is_superuser)
+
+    @property
+    def is_employee(self):
+        return self.employee is not None
+
+    @property
+    def is_customer(self):
+        return self.customer is not None
+
+
+def get_principal(request):
+    """
+    Resolve the caller once per request (2 queries) and cache it on the underlying HttpRequest.
+
+    Works with a DRF Request or a plain HttpRequest.
+    """
+    http_request = getattr(request, '_request', request)
+    principal = getattr(http_request, '_principal', None)
+    if principal is None:
+        principal = _resolve(request.user)
+        http_request._principal = principal
+    return principal
+
+
+def _resolve(jwt_user):
+    if jwt_user is None or not getattr(jwt_user, 'is_authenticated', False):
+        return Principal()
+
+    queryset = User.objects.select_related('hr_customer').prefetch_related('employees')
+    user = None
+    user_id = getattr(jwt_user, 'id', None)
+    if user_id:
+        try:
+            user = queryset.filter(id=user_id).first()
+        except (ValidationError, ValueError):
+            user = None
+    email = getattr(jwt_user, 'email', None)
+    if user is None and email:
+        user = queryset.filter(email=email).first()
+    if user is None:
+        return Principal()
+
+    employees = list(user.employees.all())
+    return Principal(
+        user=user,
+        employee=employees[0] if employees else None,
+        customer=getattr(user, 'hr_customer', None),
+    )
@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+class RoleScopeCache:
+    """
+    Process-wide cache of the scope set granted by each Role and by each employee's roles.
+
+    - Role được lưu/xóa thì bỏ scope của role đó và toàn bộ cache theo nhân viên (xem `oauth.signals`).
+    - Thay đổi employee.roles (M2M) chỉ bỏ cache của các nhân viên liên quan.
+    - Tự xóa sau TTL_SECONDS để bù cho các thay đổi không đi qua signal (worker khác, ...).
+    """
+    TTL_SECONDS = 300
+
+    _lock = threading.RLock()
+    _loaded_at = None
+    _by_role = {}  # role id -> frozenset(scope)
+    _by_employee = {}  # employee id -> frozenset(scope)
+
+    @classmethod
+    def role_scopes(cls, role):
+        """Scope names of a role that exist in the scopes backend (`__all__` = every scope)."""
+        with cls._lock:
+            cls._expire()
+            scopes = cls._by_role.get(role.id)
+        if scopes is None:
+            # Don't move this import to global scope, because it it lazay object.
+            from oauth2_provider.scopes import get_scopes_backend
+            all_scopes = get_scopes_backend().get_all_scopes()
+            if role.scope == "__all__":
+                scopes = frozenset(all_scopes)
+            else:
+                scopes = frozenset(all_scopes).intersection((role.scope or "").split())
+            with cls._lock:
+                cls._by_role[role.id] = scopes
+        return scopes
+
+    @classmethod
+    def employee_scopes(cls, employee):
+        """Union of the scopes of every role of an employee (dùng prefetch `roles` nếu có)."""
+        with cls._lock:
+            cls._expire()
+            scopes = cls._by_employee.get(employee.id)
+        if scopes is None:
+            scopes = frozenset().union(*(cls.role_scopes(role) for role in employee.roles.all()))
+            with cls._lock:
+                cls._by_employee[employee.id] = scopes
+        return scopes
+
+    @classmethod
+    def invalidate_role(cls, role_id):
+        with cls._lock:
+            cls._by_role.pop(role_id, None)
+            cls._by_employee = {}
+
+    @classmethod
+    def invalidate_employees(cls, employee_ids=None):
+        """Drop the cached scopes of some employees (None = every employee)."""
+        with cls._lock:
+            if employee_ids is None:
+                cls._by_employee = {}
+                return
+            for employee_id in employee_ids:
+                cls._by_employee.pop(employee_id, None)
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._by_role = {}
+            cls._by_employee = {}
+            cls._loaded_at = None
+
+    @classmethod
+    def _expire(cls):
+        now = time.monotonic()
+        if cls._loaded_at is None or now - cls._loaded_at > cls.TTL_SECONDS:
+            cls._by_role = {}
+            cls._by_employee = {}
+            cls._loaded_at = now
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Role
+from .role_scopes import RoleScopeCache
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_scopes(sender, instance, **kwargs):
+    role_id = instance.id
+    transaction.on_commit(lambda: RoleScopeCache.invalidate_role(role_id))
+
+
+@receiver(m2m_changed, sender=Role.employees.through)
+def invalidate_employee_scopes(sender, instance, action, reverse, pk_set, **kwargs):
+    """employee.roles thay đổi: bỏ scope đã cache của các nhân viên liên quan."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        employee_ids = [instance.id]
+    elif pk_set:
+        employee_ids = list(pk_set)
+    else:
+        # role.employees.clear(): không biết nhân viên nào bị ảnh hưởng
+        employee_ids = None
+    transaction.on_commit(lambda: RoleScopeCache.invalidate_employees(employee_ids))
@@ -1,3 +1,50 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
 from django.test import TestCase
+from django.utils import timezone
+
+from .claims_cache import VerifiedClaimsCache
+from .models import AccessToken
+from .oauth_validators import CustomOAuth2Validator
+
+
+class RevokedTokenValidationTests(TestCase):
+    """Claims đã cache không được làm token đã thu hồi (ở process này hay worker khác) hợp lệ trở lại."""
+
+    token = "header.payload.signature"
+
+    def setUp(self):
+        VerifiedClaimsCache.clear()
+        # Claims như sau khi verify chữ ký thành công: các request sau đọc từ cache
+        VerifiedClaimsCache.put(self.token, {
+            "scope": "users:view-mine",
+            "sub": "1",
+            "aud": "client",
+            "exp": int(time.time()) + 3600,
+        })
+        AccessToken.objects.create(
+            token=self.token, scope="users:view-mine", expires=timezone.now() + timedelta(hours=1)
+        )
+        self.validator = CustomOAuth2Validator()
+
+    def tearDown(self):
+        VerifiedClaimsCache.clear()
+
+    def validate(self):
+        return self.validator.validate_bearer_jwt_token(self.token, [], SimpleNamespace())
+
+    def test_cached_token_is_valid(self):
+        self.assertTrue(self.validate())
+
+    def test_revoke_then_validate(self):
+        self.validator.revoke_token(self.token, "access_token", SimpleNamespace())
+        self.assertFalse(self.validate())
 
-# Create your tests here.
+    def test_revoked_by_another_worker_then_validate(self):
+        # Xóa row như AccessToken.revoke() ở worker khác: cache của process này không được báo
+        AccessToken.objects.for_token(self.token).delete()
+        self.assertIsNotNone(VerifiedClaimsCache.get(self.token))
+        self.assertFalse(self.validate())
+        self.assertIsNone(VerifiedClaimsCache.get(self.token))
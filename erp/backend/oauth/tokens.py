@@ -251,6 +251,8 @@ class JWTApplication():
 class JWTAccessToken():
     def __init__(self, claims):
         self.scope = claims["scope"]
+        # Tách scope một lần cho cả request
+        self.scope_set = frozenset(self.scope.split()) if self.scope else frozenset()
         self.user = JWTUser(
             id=claims["sub"],
             email=claims.get("email", None),
@@ -279,10 +281,7 @@ class JWTAccessToken():
         if self.scope is None:
             return False
 
-        provided_scopes = set(self.scope.split())
-        resource_scopes = set(scopes)
-
-        return resource_scopes.issubset(provided_scopes)
+        return self.scope_set.issuperset(scopes)
     
     def is_expired(self):
         """
@@ -309,5 +308,4 @@ class JWTAccessToken():
         # Don't move this import to global scope, because it it lazay object.
         from oauth2_provider.scopes import get_scopes_backend
         all_scopes = get_scopes_backend().get_all_scopes()
-        token_scopes = self.scope.split()
-        return {name: desc for name, desc in all_scopes.items() if name in token_scopes}
\ No newline at end of file
+        return {name: desc for name, desc in all_scopes.items() if name in self.scope_set}
\ No newline at end of file
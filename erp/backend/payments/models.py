@@ -206,6 +206,10 @@ class Payment(TimeStampedModel):
             self.order.status = 'PAID'
             self.order.save()
             logger.info(f"Order {self.order.id} status updated from PENDING_PAYMENT to PAID")
+
+            # Đơn đã có thể giao việc: tính trước danh sách nhân viên đề xuất
+            from businesses.services.recommendation_cache import RecommendationCache
+            RecommendationCache.schedule(self.order)
     
     def mark_as_cancelled(self, reason=None):
         """Hủy thanh toán"""